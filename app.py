@@ -4,20 +4,32 @@ Human-in-the-Loop Interface for PDF Sanitization with Agentic Workflow
 """
 
 import streamlit as st
+import gc
+import hashlib
+import logging
 import os
 import tempfile
-from typing import Dict, Any, List, Optional
-import fitz  # PyMuPDF
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from PIL import Image
 import io
 import json
-from streamlit_drawable_canvas import st_canvas
-import pandas as pd
+import numpy as np
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-# Import backend components
-from nodes.orchestrator import build_sanitizer_graph
-from nodes.state import SanitizerState
-from nodes.manual_redactor_node import apply_manual_redactions, combine_ai_and_manual_redactions
+# Import backend components (the package resolves its node exports on first use)
+import nodes
+
+# Heavy UI-side modules (PyMuPDF, pandas, the canvas component) are imported
+# where they are used so the upload UI paints before they load.
+if TYPE_CHECKING:
+    import fitz  # PyMuPDF
+    import pandas as pd
 
 
 # Configuration
@@ -26,6 +38,30 @@ CANVAS_HEIGHT = 1000
 HIGHLIGHT_COLOR = "#FFFF00"  # Yellow for AI detections
 MANUAL_COLOR = "#00FF00"    # Green for manual selections
 REDACTION_COLOR = "#FF0000" # Red for final redactions
+PAGE_JPEG_QUALITY = 85      # Canvas background encoding quality
+WORKER_POOL_SIZE = min(8, os.cpu_count() or 1)  # Shared background thread pool bound
+MANUAL_DEDUP_GRID = 5.0     # PDF points; manual boxes whose corners are closer than this are duplicates
+MANUAL_CONTENT = "[Manual Selection]"
+MANUAL_REASON = "Manually selected sensitive area"
+APPROVAL_POLL_SECONDS = 0.5  # How often the UI checks on a background approval run
+CHECKPOINT_IDLE_SECONDS = 3600  # Checkpoint threads unused this long (abandoned sessions) are deleted
+ITEM_COLUMNS = ["page_number", "content", "reason", "x0", "y0", "x1", "y1"]
+BBOX_KEYS = ("x0", "y0", "x1", "y1")
+# Manual selections: int32 page + float32 coords (ample for PDF points), ~20 bytes of numbers per box
+MANUAL_DTYPES = {"page_number": "int32", **{k: "float32" for k in BBOX_KEYS}}
+
+# The nodes write under output/ relative to the working directory; resolve it once
+OUTPUT_BASE = Path(os.getcwd()) / "output"
+OUTPUT_SUBDIRS = ("original", "preview", "redacted")
+
+# Workflow milestones log at INFO; verbose tracing is opt-in: REDACTFLOW_DEBUG=1 streamlit run app.py
+DEBUG = os.environ.get("REDACTFLOW_DEBUG") == "1"
+# Configured on the package logger so node loggers (redactflow.redactor, ...) share it
+_root_logger = logging.getLogger("redactflow")
+_root_logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+if not _root_logger.handlers:
+    _root_logger.addHandler(logging.StreamHandler())
+logger = logging.getLogger("redactflow.app")
 
 
 def init_session_state():
@@ -35,7 +71,8 @@ def init_session_state():
         st.session_state.current_page = 0
         st.session_state.pdf_doc = None
         st.session_state.canvas_key = 0
-        st.session_state.manual_rectangles = []
+        st.session_state.editor_version = 0
+        st.session_state.manual_df = empty_items_frame()
         st.session_state.workflow_running = False
         st.session_state.preview_approved = False
         st.session_state.show_approval_buttons = False
@@ -45,40 +82,247 @@ def init_session_state():
         st.session_state.rejection_message = None
 
 
-def load_pdf_page_as_image(pdf_doc: fitz.Document, page_num: int, width: int = CANVAS_WIDTH) -> Image.Image:
+@st.cache_resource
+def get_compiled_sanitizer_app():
+    """Build and compile the workflow once per process with an in-memory checkpointer.
+
+    The graph pauses before HumanInLoop; approving resumes the same thread from
+    its checkpoint instead of re-running Orchestrator -> Detector -> Evaluator.
+    """
+    from langgraph.checkpoint.memory import MemorySaver
+
+    return nodes.build_sanitizer_graph().compile(interrupt_before=["HumanInLoop"], checkpointer=MemorySaver())
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _scan_pdfs(path: str, mtime: float) -> List[str]:
+    """Sorted PDF names in a directory; ``mtime`` keys the cache to its contents."""
+    with os.scandir(path) as it:
+        return sorted(e.name for e in it if e.name.endswith(".pdf") and e.is_file())
+
+
+def list_output_pdfs(path: Path) -> List[str]:
+    """PDF names under an output/ subdirectory, or [] if it does not exist yet."""
+    try:
+        return _scan_pdfs(str(path), path.stat().st_mtime)
+    except FileNotFoundError:
+        return []
+
+
+@st.cache_data(show_spinner=False, max_entries=2, ttl=3600)
+def _final_pdf_bytes(path: str, mtime: float) -> bytes:
+    """Read a finished PDF once per (path, mtime) instead of on every rerun.
+
+    Bounded so a long-running server does not keep every redacted PDF in memory.
+    """
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Detector OCR output: large, and unused by the UI once a document is finished
+LARGE_STATE_KEYS = (
+    "page_level_pdf_elements",
+    "word_level_pdf_elements",
+    "_page_content_by_page",
+    "_page_text_joined",
+    "_page_text_source_len",
+    "_word_elements_json",
+    "_word_elements_json_len",
+)
+
+
+def release_workflow_artifacts() -> None:
+    """Free the current document's OCR payloads, AI snapshot and checkpoint thread."""
+    workflow_state = st.session_state.get("workflow_state") or {}
+    if not any(key in workflow_state for key in LARGE_STATE_KEYS):
+        return  # No workflow has run, or it was already released
+
+    for key in LARGE_STATE_KEYS:
+        workflow_state.pop(key, None)
+    st.session_state.pop("original_ai_detections", None)
+
+    # MemorySaver keeps every checkpoint of the thread, OCR payloads included
+    thread_id = st.session_state.get("workflow_thread_id")
+    app = get_compiled_sanitizer_app()
+    job = st.session_state.get("approval_job")
+    if job is not None and not job.done():
+        # An approval is still resuming this thread; delete it once the job ends
+        job.add_done_callback(lambda _: delete_checkpoint_thread(app, thread_id))
+    else:
+        delete_checkpoint_thread(app, thread_id)
+
+    # One explicit pass to reclaim the freed element lists
+    gc.collect()
+
+
+def discard_approval_job() -> None:
+    """Detach the session from its approval job (e.g. on a new upload).
+
+    A job that has not started is cancelled; one already running finishes in the
+    background and its result is dropped, never applied to another document.
+    """
+    job = st.session_state.get("approval_job")
+    if job is not None:
+        job.cancel()
+    for key in ("approval_job", "approval_job_thread", "approval_counts", "approval_error"):
+        st.session_state.pop(key, None)
+
+
+def approval_in_progress() -> bool:
+    """True while a submitted approval job has not been picked up yet."""
+    return st.session_state.get("approval_job") is not None
+
+
+def _on_download(final_path: str, mtime: float) -> None:
+    """Download delivered: drop the cached bytes and the finished workflow's payloads.
+
+    Keyed on (path, mtime): output paths are deterministic, so a later redaction of
+    the same file writes a new PDF to the same path.
+    """
+    st.session_state.downloaded = (final_path, mtime)
+    _final_pdf_bytes.clear()
+    release_workflow_artifacts()
+
+
+@st.cache_resource
+def _checkpoint_threads() -> tuple:
+    """Process-wide (lock, {thread_id: last use, time.monotonic()}) for idle eviction."""
+    return threading.Lock(), {}
+
+
+def delete_checkpoint_thread(app, thread_id: Optional[str]) -> None:
+    """Drop every checkpoint of a thread from the in-memory saver (no-op if already gone).
+
+    Safe to call from worker threads; the idle registry entry is pruned by eviction.
+    """
+    delete_thread = getattr(app.checkpointer, "delete_thread", None)
+    if thread_id and delete_thread is not None:
+        delete_thread(thread_id)
+
+
+def _evict_idle_checkpoints(app) -> None:
+    """Delete checkpoint threads not used for CHECKPOINT_IDLE_SECONDS (sessions that never finished)."""
+    lock, last_used = _checkpoint_threads()
+    cutoff = time.monotonic() - CHECKPOINT_IDLE_SECONDS
+    with lock:
+        idle = [thread_id for thread_id, used in last_used.items() if used < cutoff]
+        for thread_id in idle:
+            del last_used[thread_id]
+    for thread_id in idle:
+        logger.info("🧹 Evicting idle checkpoint thread %s", thread_id)
+        delete_checkpoint_thread(app, thread_id)
+
+
+def workflow_config() -> Dict[str, Any]:
+    """LangGraph config addressing this session's checkpoint thread (and marking it in use)."""
+    thread_id = st.session_state.get("workflow_thread_id") or st.session_state.current_file_key
+    app = get_compiled_sanitizer_app()
+    _evict_idle_checkpoints(app)
+    lock, last_used = _checkpoint_threads()
+    with lock:
+        last_used[thread_id] = time.monotonic()
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def upload_digest(uploaded_file) -> str:
+    """MD5 of an uploaded file, computed once per upload rather than on every rerun."""
+    cached = st.session_state.get("_upload_digest")
+    if cached and cached[0] == uploaded_file.file_id:
+        return cached[1]
+    digest = hashlib.md5(uploaded_file.getvalue()).hexdigest()
+    st.session_state._upload_digest = (uploaded_file.file_id, digest)
+    return digest
+
+
+def _file_md5(path: str) -> str:
+    """MD5 of a file on disk, read in 1 MiB chunks."""
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _rasterize_page(file_key: str, pdf_path: str, page_num: int, width: int) -> bytes:
+    """Rasterize a PDF page to JPEG bytes.
+
+    Cached on (file_key, page_num, width) so Streamlit reruns reuse the encoded
+    image instead of re-running PyMuPDF. ``file_key`` identifies the upload.
+    """
+    import fitz  # PyMuPDF
+
+    with nodes.FITZ_LOCK:
+        doc = fitz.open(pdf_path)
+        try:
+            page = doc[page_num]
+            
+            # Calculate scale so neither dimension exceeds the canvas
+            page_rect = page.rect
+            scale = min(width / page_rect.width, CANVAS_HEIGHT / page_rect.height)
+            
+            # Render page as an opaque RGB image (3 bytes per pixel)
+            mat = fitz.Matrix(scale, scale)
+            pix = page.get_pixmap(matrix=mat, colorspace=fitz.csRGB, alpha=False)
+            return pix.tobytes("jpeg", jpg_quality=PAGE_JPEG_QUALITY)
+        finally:
+            doc.close()
+
+
+@st.cache_resource
+def get_pdf_doc(pdf_path: str, mtime: float) -> "fitz.Document":
+    """Open a PDF once per (path, mtime); Streamlit owns the handle's lifetime."""
+    import fitz  # PyMuPDF
+
+    with nodes.FITZ_LOCK:
+        return fitz.open(pdf_path)
+
+
+@st.cache_resource
+def _pool() -> ThreadPoolExecutor:
+    """Process-wide bounded worker pool for background work (page prefetch and the like)."""
+    return ThreadPoolExecutor(max_workers=WORKER_POOL_SIZE, thread_name_prefix="redactflow")
+
+
+def _prefetch_page(ctx, file_key: str, pdf_path: str, page_num: int, width: int) -> None:
+    # Attach the session's script context so the cache call doesn't warn from a pool thread
+    add_script_run_ctx(threading.current_thread(), ctx)
+    _rasterize_page(file_key, pdf_path, page_num, width)
+
+
+def prefetch_neighbor_pages(file_key: str, pdf_path: str, page_num: int, total_pages: int, width: int = CANVAS_WIDTH) -> None:
+    """Warm the rasterization cache for the previous and next pages."""
+    pool = _pool()
+    ctx = get_script_run_ctx()
+    for neighbor in (page_num + 1, page_num - 1):
+        if 0 <= neighbor < total_pages:
+            # Rendering holds nodes.FITZ_LOCK, so this never runs MuPDF concurrently with other fitz work
+            pool.submit(_prefetch_page, ctx, file_key, pdf_path, neighbor, width)
+
+
+def load_pdf_page_as_image(file_key: str, pdf_path: str, page_num: int, width: int = CANVAS_WIDTH) -> Image.Image:
     """Convert PDF page to PIL Image for canvas display."""
-    page = pdf_doc[page_num]
-    
-    # Calculate scale to fit canvas width
-    page_rect = page.rect
-    scale = width / page_rect.width
-    
-    # Render page as image
-    mat = fitz.Matrix(scale, scale)
-    pix = page.get_pixmap(matrix=mat)
-    img_data = pix.tobytes("png")
-    
+    img_data = _rasterize_page(file_key, pdf_path, page_num, width)
     return Image.open(io.BytesIO(img_data))
 
 
-def canvas_to_pdf_coordinates(canvas_coords: Dict, page_rect: fitz.Rect, canvas_width: int, canvas_height: int) -> Dict[str, float]:
-    """Convert canvas coordinates to PDF coordinates (PyMuPDF points)."""
-    scale_x = page_rect.width / canvas_width
-    scale_y = page_rect.height / canvas_height
-    
+def _canvas_scale(page_rect: "fitz.Rect", canvas_width: int = CANVAS_WIDTH, canvas_height: int = CANVAS_HEIGHT) -> tuple:
+    """Return (scale_x, scale_y) mapping PDF points to canvas pixels for a page."""
+    return canvas_width / page_rect.width, canvas_height / page_rect.height
+
+
+def _canvas_to_pdf_inline(canvas_coords: Dict, scale_x: float, scale_y: float) -> Dict[str, float]:
+    """Hot-path conversion using precomputed PDF->canvas scale factors."""
     return {
-        "x0": canvas_coords["left"] * scale_x,
-        "y0": canvas_coords["top"] * scale_y,
-        "x1": (canvas_coords["left"] + canvas_coords["width"]) * scale_x,
-        "y1": (canvas_coords["top"] + canvas_coords["height"]) * scale_y
+        "x0": canvas_coords["left"] / scale_x,
+        "y0": canvas_coords["top"] / scale_y,
+        "x1": (canvas_coords["left"] + canvas_coords["width"]) / scale_x,
+        "y1": (canvas_coords["top"] + canvas_coords["height"]) / scale_y
     }
 
 
-def pdf_to_canvas_coordinates(pdf_coords: Dict[str, float], page_rect: fitz.Rect, canvas_width: int, canvas_height: int) -> Dict:
-    """Convert PDF coordinates to canvas coordinates."""
-    scale_x = canvas_width / page_rect.width
-    scale_y = canvas_height / page_rect.height
-    
+def _pdf_to_canvas_inline(pdf_coords: Dict[str, float], scale_x: float, scale_y: float) -> Dict:
+    """Hot-path conversion using precomputed PDF->canvas scale factors."""
     return {
         "left": pdf_coords["x0"] * scale_x,
         "top": pdf_coords["y0"] * scale_y,
@@ -87,110 +331,567 @@ def pdf_to_canvas_coordinates(pdf_coords: Dict[str, float], page_rect: fitz.Rect
     }
 
 
-def create_canvas_objects(sensitive_items: List[Dict], manual_items: List[Dict], page_num: int, page_rect: fitz.Rect) -> List[Dict]:
-    """Create canvas objects for AI detections and manual selections."""
+def _canvas_rects_to_pdf(rects: List[Dict], scale_x: float, scale_y: float) -> List[List[float]]:
+    """Batch-convert fabric.js rect objects to [x0, y0, x1, y1] PDF coordinates."""
+    if not rects:
+        return []
+
+    arr = np.array([[r["left"], r["top"], r["width"], r["height"]] for r in rects], dtype=float)
+    arr[:, 2:] += arr[:, :2]
+    return (arr / np.array([scale_x, scale_y, scale_x, scale_y])).tolist()
+
+
+def canvas_to_pdf_coordinates(canvas_coords: Dict, page_rect: "fitz.Rect", canvas_width: int, canvas_height: int) -> Dict[str, float]:
+    """Convert canvas coordinates to PDF coordinates (PyMuPDF points)."""
+    return _canvas_to_pdf_inline(canvas_coords, *_canvas_scale(page_rect, canvas_width, canvas_height))
+
+
+def pdf_to_canvas_coordinates(pdf_coords: Dict[str, float], page_rect: "fitz.Rect", canvas_width: int, canvas_height: int) -> Dict:
+    """Convert PDF coordinates to canvas coordinates."""
+    return _pdf_to_canvas_inline(pdf_coords, *_canvas_scale(page_rect, canvas_width, canvas_height))
+
+
+def _bbox_key(items: List[Dict]) -> tuple:
+    """Hashable (page_number, x0, y0, x1, y1) rows identifying the boxes of a detection list."""
+    return tuple(
+        (i.get("page_number"), i["bbox"]["x0"], i["bbox"]["y0"], i["bbox"]["x1"], i["bbox"]["y1"])
+        for i in items
+    )
+
+
+def _frame_bbox_key(df: "pd.DataFrame") -> tuple:
+    """Hashable (page_number, x0, y0, x1, y1) rows taken column-wise from an items frame."""
+    return tuple(df[["page_number", *BBOX_KEYS]].itertuples(index=False, name=None))
+
+
+def _canvas_rects_for_page(rows: tuple, page_num: int, scale_x: float, scale_y: float) -> np.ndarray:
+    """Return an (M, 4) array of canvas left/top/width/height for the _bbox_key rows on a page."""
+    if not rows:
+        return np.empty((0, 4))
+
+    arr = np.array(rows, dtype=float)
+    coords = arr[arr[:, 0] == page_num + 1, 1:] * np.array([scale_x, scale_y, scale_x, scale_y])  # Convert to 1-based
+    coords[:, 2] -= coords[:, 0]
+    coords[:, 3] -= coords[:, 1]
+    return coords
+
+
+def _manual_rect_key(page_number: int, x0: float, y0: float) -> tuple:
+    """Quantize a manual rectangle's top-left corner to a 5-point grid cell."""
+    return (page_number, int(x0 // MANUAL_DEDUP_GRID), int(y0 // MANUAL_DEDUP_GRID))
+
+
+def _manual_rect_index(manual_df: "pd.DataFrame") -> Dict[tuple, List[Tuple[float, float]]]:
+    """Grid-cell index of the manual boxes' top-left corners, derived from the current table."""
+    index: Dict[tuple, List[Tuple[float, float]]] = defaultdict(list)
+    for page_number, x0, y0 in zip(manual_df["page_number"], manual_df["x0"], manual_df["y0"]):
+        index[_manual_rect_key(int(page_number), x0, y0)].append((x0, y0))
+    return index
+
+
+def _is_known_manual_rect(index: Dict[tuple, List[Tuple[float, float]]], page_number: int, x0: float, y0: float) -> bool:
+    """True if a stored box on the page starts within 5 points of (x0, y0).
+
+    Neighbouring grid cells only narrow down the candidates; the tolerance test is exact.
+    """
+    _, gx, gy = _manual_rect_key(page_number, x0, y0)
+    return any(
+        abs(cx - x0) < MANUAL_DEDUP_GRID and abs(cy - y0) < MANUAL_DEDUP_GRID
+        for dx in (-1, 0, 1)
+        for dy in (-1, 0, 1)
+        for cx, cy in index.get((page_number, gx + dx, gy + dy), ())
+    )
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _canvas_objects_cached(sensitive_key: tuple, manual_key: tuple, page_num: int, page_w: float, page_h: float) -> List[Dict]:
+    """Build the canvas rectangles for a page; reruns with unchanged detections hit the cache."""
+    scale_x, scale_y = CANVAS_WIDTH / page_w, CANVAS_HEIGHT / page_h
+
     objects = []
-    
-    # Add AI detected items (yellow)
-    for item in sensitive_items:
-        if item.get("page_number") == page_num + 1:  # Convert to 1-based
-            canvas_coords = pdf_to_canvas_coordinates(item["bbox"], page_rect, CANVAS_WIDTH, CANVAS_HEIGHT)
-            objects.append({
-                "type": "rect",
-                "left": canvas_coords["left"],
-                "top": canvas_coords["top"],
-                "width": canvas_coords["width"],
-                "height": canvas_coords["height"],
-                "fill": HIGHLIGHT_COLOR,
-                "stroke": HIGHLIGHT_COLOR,
-                "strokeWidth": 2,
-                "opacity": 0.5
-            })
-    
-    # Add manual selections (green)
-    for item in manual_items:
-        if item.get("page_number") == page_num + 1:  # Convert to 1-based
-            canvas_coords = pdf_to_canvas_coordinates(item["bbox"], page_rect, CANVAS_WIDTH, CANVAS_HEIGHT)
-            objects.append({
+
+    # AI detected items (yellow), then manual selections (green)
+    for rows, color in ((sensitive_key, HIGHLIGHT_COLOR), (manual_key, MANUAL_COLOR)):
+        objects.extend(
+            {
                 "type": "rect",
-                "left": canvas_coords["left"],
-                "top": canvas_coords["top"],
-                "width": canvas_coords["width"],
-                "height": canvas_coords["height"],
-                "fill": MANUAL_COLOR,
-                "stroke": MANUAL_COLOR,
+                "left": left,
+                "top": top,
+                "width": width,
+                "height": height,
+                "fill": color,
+                "stroke": color,
                 "strokeWidth": 2,
                 "opacity": 0.5
-            })
-    
+            }
+            for left, top, width, height in _canvas_rects_for_page(rows, page_num, scale_x, scale_y).tolist()
+        )
+
     return objects
 
 
+def create_canvas_objects(sensitive_items: List[Dict], manual_df: "pd.DataFrame", page_num: int, page_rect: "fitz.Rect") -> List[Dict]:
+    """Create canvas objects for AI detections and manual selections."""
+    return _canvas_objects_cached(
+        _bbox_key(sensitive_items),
+        _frame_bbox_key(manual_df),
+        page_num,
+        float(page_rect.width),
+        float(page_rect.height),
+    )
+
+
 def run_agentic_workflow(state: Dict[str, Any]) -> Dict[str, Any]:
     """Execute the agentic workflow using LangGraph."""
     try:
-        # Build the workflow graph
-        graph = build_sanitizer_graph()
-        
-        # Compile with interrupt before HumanInLoop to pause workflow for UI input
-        app = graph.compile(interrupt_before=["HumanInLoop"])
+        # Compiled graph pauses before HumanInLoop and checkpoints every node
+        app = get_compiled_sanitizer_app()
         
         # Execute workflow (will pause before HumanInLoop)
-        sensitive_items = state.get('sensitive_data', [])
-        print(f"🔄 AI WORKFLOW DEBUG:")
-        print(f"   📊 Starting workflow with state keys: {list(state.keys())}")
-        print(f"   📋 User approval: {state.get('user_approval')}")
-        print(f"   📄 PDF path: {state.get('pdf_path')}")
-        print(f"   🤖 AI items for workflow: {len(sensitive_items)}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("🔄 AI WORKFLOW DEBUG:")
+            logger.debug("   📊 Starting workflow with state keys: %s", list(state.keys()))
+            logger.debug("   📋 User approval: %s", state.get('user_approval'))
+            logger.debug("   📄 PDF path: %s", state.get('pdf_path'))
+            logger.debug("   🤖 AI items for workflow: %s", len(state.get('sensitive_data', [])))
         
-        result = app.invoke(state)
+        result = app.invoke(state, config=workflow_config())
         
-        print(f"   ⏸️ Workflow paused at HumanInLoop with state keys: {list(result.keys())}")
-        print(f"   📁 Preview PDF path: {result.get('preview_pdf_path')}")
+        if debug:
+            logger.debug("   ⏸️ Workflow paused at HumanInLoop with state keys: %s", list(result.keys()))
+            logger.debug("   📁 Preview PDF path: %s", result.get('preview_pdf_path'))
         
         return result
         
     except Exception as e:
-        print(f"❌ Workflow execution error: {str(e)}")
+        logger.exception("❌ Workflow execution error: %s", e)
         st.error(f"Workflow execution error: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
         return state
 
 
+WORKFLOW_STAGES = (
+    "🎯 Orchestrator",
+    "🔍 Searcher",
+    "🤖 Detector",
+    "📊 Evaluator",
+    "👤 Human Review",
+    "✂️ Redactor",
+)
+
+
+def workflow_stage_status(state: Dict[str, Any], awaiting_review: bool) -> tuple:
+    """Return the st.success/st.warning/st.info name for each of WORKFLOW_STAGES."""
+    return (
+        "success" if state.get("sensitive_data_description") else "info",
+        "success" if state.get("search_query") else "info",
+        "success" if state.get("sensitive_data") else "info",
+        "success" if state.get("evaluator_cycles", 0) > 0 else "info",
+        "warning" if awaiting_review else "info",
+        "success" if state.get("final_pdf_path") else "info",
+    )
+
+
+def run_approval(app, config: Dict[str, Any], workflow_state: Dict[str, Any], manual: List[Dict]) -> Dict[str, Any]:
+    """Approve Preview job: resume the checkpoint through HITL and Redactor.
+
+    The Redactor applies AI items and manual boxes in a single pass over the PDF.
+
+    Runs on the worker pool, so everything it needs is passed in and it never
+    touches st.session_state.
+    """
+    # Apply the user's decision as the HumanInLoop step, then resume to Redactor
+    logger.debug("   🔄 Step 1: Running HITL node directly")
+    hitl_result = nodes.run_hitl(workflow_state)
+    logger.debug("   📋 HITL result next_node: %s", hitl_result.get('next_node'))
+    
+    if hitl_result.get('next_node') != 'Redactor':
+        logger.warning("❌ HITL did not route to Redactor, got: %s", hitl_result.get('next_node'))
+        raise RuntimeError("AI workflow failed to produce redacted PDF")
+    
+    hitl_result["manual_rectangles"] = manual
+    try:
+        if app.get_state(config).values:
+            logger.debug("   🔄 Step 2: Resuming workflow from checkpoint into Redactor")
+            app.update_state(config, hitl_result, as_node="HumanInLoop")
+            result = app.invoke(None, config=config)
+        else:
+            # Checkpoint already freed (an earlier attempt ended): redact directly
+            logger.debug("   🔄 Step 2: No checkpoint left, running Redactor directly")
+            result = nodes.run_redactor(hitl_result)
+    finally:
+        # The thread is not needed once redaction has run, successfully or not
+        delete_checkpoint_thread(app, config["configurable"]["thread_id"])
+    if not result.get('final_pdf_path'):
+        raise RuntimeError("AI workflow failed to produce redacted PDF")
+    logger.info("✅ Redaction completed (%s manual boxes) → %s", len(manual), result['final_pdf_path'])
+    
+    return {"state": result}
+
+
+@st.fragment(run_every=APPROVAL_POLL_SECONDS)
+def render_approval_progress():
+    """Poll the background approval run; hand over to a full rerun once it finishes."""
+    job = st.session_state.approval_job
+    if not job.done():
+        st.info("🔄 Generating redacted PDF... the review tables and canvas are locked until it finishes.")
+        if st.button("✖️ Cancel", key="cancel_approval"):
+            if job.cancel():
+                st.session_state.approval_job = None
+                st.session_state.preview_approved = False
+                st.session_state.show_approval_buttons = True
+                st.rerun()
+            st.warning("Redaction has already started and will finish in the background.")
+        return
+    
+    st.session_state.approval_job = None
+    if st.session_state.get("approval_job_thread") != st.session_state.get("workflow_thread_id"):
+        # Started for a document that has since been replaced: never apply its result
+        logger.info("Dropping result of a stale approval job")
+        st.rerun()
+    try:
+        outcome = job.result()
+    except Exception as e:
+        logger.exception("❌ Approval workflow error: %s", e)
+        # Back to review so the user can retry
+        st.session_state.approval_error = str(e)
+        st.session_state.preview_approved = False
+        st.session_state.show_approval_buttons = True
+    else:
+        ai_count, manual_count = st.session_state.approval_counts
+        st.session_state.workflow_state = outcome["state"]
+        st.session_state.approval_summary = {
+            "ai_count": ai_count,
+            "manual_count": manual_count,
+            "final_path": outcome["state"].get("final_pdf_path"),
+        }
+    st.rerun()
+
+
+def render_approval_summary(summary: Optional[Dict[str, Any]]) -> None:
+    """Report the steps of the last approval run and the files it left in output/."""
+    if not summary:
+        return
+    
+    manual_note = f" and {summary['manual_count']} manual selections" if summary["manual_count"] else ""
+    st.success(f"✅ Redaction completed! {summary['ai_count']} AI items{manual_note} redacted. Final PDF ready for download.")
+    st.info(f"📁 Redacted file saved: `{summary['final_path']}`")
+    
+    # Show file structure (one stat per subdirectory; a missing one just lists nothing)
+    listings = [(sub, files) for sub in OUTPUT_SUBDIRS if (files := list_output_pdfs(OUTPUT_BASE / sub))]
+    if listings:
+        st.markdown("**📂 Files created in `output/` directory:**")
+        
+        for sub, files in listings:
+            listing = "\n".join(f"  - `{file}`" for file in files)
+            st.markdown(f"**📁 {sub}/**\n{listing}")
+
+
 def display_workflow_progress(state: Dict[str, Any]):
     """Display workflow progress indicators."""
     st.subheader("🔄 Workflow Progress")
     
-    # Determine current stage
-    stages = [
-        ("🎯 Orchestrator", "orchestrator"),
-        ("🔍 Searcher", "searcher"),
-        ("🤖 Detector", "detector"),
-        ("📊 Evaluator", "evaluator"),
-        ("👤 Human Review", "hitl"),
-        ("✂️ Redactor", "redactor")
-    ]
+    status = workflow_stage_status(state, st.session_state.show_approval_buttons)
+    for col, stage_name, kind in zip(st.columns(len(WORKFLOW_STAGES)), WORKFLOW_STAGES, status):
+        getattr(col, kind)(stage_name)
+
+
+@st.fragment
+def render_canvas_fragment():
+    """Render the PDF canvas pane; widget interactions here only rerun this fragment."""
+    from streamlit_drawable_canvas import st_canvas
+
+    pdf_path = st.session_state.workflow_state.get("pdf_path")
+    st.subheader("📄 PDF Canvas")
     
-    cols = st.columns(len(stages))
-    
-    for i, (stage_name, stage_key) in enumerate(stages):
-        with cols[i]:
-            # Determine stage status
-            if stage_key == "orchestrator" and state.get("sensitive_data_description"):
-                st.success(stage_name)
-            elif stage_key == "searcher" and state.get("search_query"):
-                st.success(stage_name)
-            elif stage_key == "detector" and state.get("sensitive_data"):
-                st.success(stage_name)
-            elif stage_key == "evaluator" and state.get("evaluator_cycles", 0) > 0:
-                st.success(stage_name)
-            elif stage_key == "hitl" and st.session_state.show_approval_buttons:
-                st.warning(stage_name)
-            elif stage_key == "redactor" and state.get("final_pdf_path"):
-                st.success(stage_name)
+    # Page navigation
+    with nodes.FITZ_LOCK:
+        total_pages = len(st.session_state.pdf_doc)
+    if total_pages > 1:
+        nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+        
+        with nav_col1:
+            if st.button("⬅️ Previous", disabled=st.session_state.current_page == 0):
+                st.session_state.current_page = max(0, st.session_state.current_page - 1)
+                st.session_state.canvas_key += 1
+                st.rerun(scope="fragment")  # Only the canvas depends on the page
+        
+        with nav_col2:
+            st.markdown(f"**Page {st.session_state.current_page + 1} of {total_pages}**")
+        
+        with nav_col3:
+            if st.button("Next ➡️", disabled=st.session_state.current_page >= total_pages - 1):
+                st.session_state.current_page = min(total_pages - 1, st.session_state.current_page + 1)
+                st.session_state.canvas_key += 1
+                st.rerun(scope="fragment")  # Only the canvas depends on the page
+    
+    # Load current page - use preview PDF if available, otherwise original
+    current_page = st.session_state.current_page
+    
+    # Use original PDF for canvas
+    page_image = load_pdf_page_as_image(st.session_state.current_file_key, pdf_path, current_page, CANVAS_WIDTH)
+    prefetch_neighbor_pages(st.session_state.current_file_key, pdf_path, current_page, total_pages)
+    with nodes.FITZ_LOCK:
+        page_rect = st.session_state.pdf_doc[current_page].rect
+    
+    # Create canvas objects for existing detections
+    sensitive_items = st.session_state.workflow_state.get("sensitive_data", [])
+    canvas_objects = create_canvas_objects(sensitive_items, st.session_state.manual_df, current_page, page_rect)
+    
+    # Drawings made while an approval job runs would not be redacted, so the canvas is locked
+    locked = approval_in_progress()
+    if locked:
+        st.caption("🔒 Locked while the redacted PDF is generated")
+    
+    # Canvas for PDF display and manual drawing
+    canvas_result = st_canvas(
+        fill_color="rgba(0, 255, 0, 0.3)",  # Green with transparency
+        stroke_width=2,
+        stroke_color="#00FF00",
+        background_image=page_image,
+        update_streamlit=True,
+        width=CANVAS_WIDTH,
+        height=CANVAS_HEIGHT,
+        drawing_mode="transform" if locked else "rect",
+        point_display_radius=0,
+        key=f"canvas_{st.session_state.canvas_key}",
+        initial_drawing={
+            "version": "4.4.0",
+            "objects": canvas_objects
+        }
+    )
+    
+    # Process canvas drawings IMMEDIATELY after canvas render
+    # This ensures manual rectangles are captured before button logic runs.
+    # Reruns that did not touch the canvas return the same payload; skip those.
+    canvas_hash = None
+    if canvas_result.json_data is not None:
+        canvas_hash = hash((
+            st.session_state.canvas_key,
+            current_page,
+            json.dumps(canvas_result.json_data, sort_keys=True),
+        ))
+    if locked:
+        logger.debug("🔧 CANVAS DEBUG: Approval in progress, skipping ingestion")
+    elif canvas_hash is not None and canvas_hash == st.session_state.get("_last_canvas_hash"):
+        logger.debug("🔧 CANVAS DEBUG: Canvas unchanged since last rerun, skipping ingestion")
+    elif canvas_result.json_data is not None:
+        st.session_state._last_canvas_hash = canvas_hash
+        objects = canvas_result.json_data["objects"]
+        logger.debug("🔧 CANVAS DEBUG:")
+        logger.debug("   📊 Canvas objects found: %s", len(objects))
+        
+        # Debug: Show all objects
+        for i, obj in enumerate(objects if logger.isEnabledFor(logging.DEBUG) else ()):
+            logger.debug("   [%s] Object type: %s, stroke: %s, fill: %s", i+1, obj.get('type'), obj.get('stroke'), obj.get('fill'))
+        
+        new_rectangles = [obj for obj in objects if obj["type"] == "rect" and obj.get("stroke") == "#00FF00"]
+        logger.debug("   🟢 Green rectangles (manual): %s", len(new_rectangles))
+        
+        # Only process if we have new rectangles and they're not already processed
+        current_manual_count = len(st.session_state.manual_df)
+        logger.debug("   📋 Current manual selections in state: %s", current_manual_count)
+        
+        # Convert all new rectangles to PDF coordinates in one vectorized divide
+        scale_x, scale_y = _canvas_scale(page_rect)
+        pdf_boxes = _canvas_rects_to_pdf(new_rectangles, scale_x, scale_y)
+        page_number = current_page + 1
+        # Rebuilt from manual_df each time, so edits and deletions in the table are respected
+        rect_index = _manual_rect_index(st.session_state.manual_df)
+        new_rows = []
+        for i, (rect, (x0, y0, x1, y1)) in enumerate(zip(new_rectangles, pdf_boxes)):
+            logger.debug("   ✏️ Processing rectangle %s: %s", i+1, rect)
+            
+            pdf_coords = {"x0": x0, "y0": y0, "x1": x1, "y1": y1}
+            logger.debug("   📍 Converted coordinates: %s", pdf_coords)
+            
+            # Check if this rectangle is already among the manual selections
+            if _is_known_manual_rect(rect_index, page_number, x0, y0):
+                logger.debug("   ⚠️ Duplicate detected, skipping")
             else:
-                st.info(stage_name)
+                new_rows.append([page_number, MANUAL_CONTENT, MANUAL_REASON, x0, y0, x1, y1])
+                rect_index[_manual_rect_key(page_number, x0, y0)].append((x0, y0))
+                logger.debug("   ✅ Added manual selection to state: %s", new_rows[-1])
+        
+        # Append all accepted rectangles to the frame in one step
+        if new_rows:
+            st.session_state.manual_df = append_item_rows(st.session_state.manual_df, new_rows)
+            st.session_state.editor_version += 1
+            # The results pane and the "Redact Manual Only (N)" count live outside this
+            # fragment; the rerun sees these boxes as known, so it does not loop
+            st.rerun(scope="app")
+            
+        logger.debug("   📋 Final manual selections count: %s", len(st.session_state.manual_df))
+    else:
+        logger.debug("🔧 CANVAS DEBUG: No canvas data available")
+    
+    # Manual drawing controls
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("✅ Confirm Manual Selections", use_container_width=True, disabled=locked):
+            # Just refresh to ensure manual rectangles are captured
+            manual_count = len(st.session_state.manual_df)
+            
+            logger.debug("🔧 MANUAL SELECTIONS DEBUG:")
+            logger.debug("   📊 Manual rectangles found: %s", manual_count)
+            logger.debug("   📋 Full manual selections data:\n%s", st.session_state.manual_df)
+            
+            if manual_count > 0:
+                st.success(f"✅ Found {manual_count} manual selection(s)")
+            else:
+                st.info("ℹ️ No manual selections found. Draw rectangles on sensitive areas.")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("   🔍 Session state keys: %s", list(st.session_state.keys()))
+                    logger.debug("   🔍 Canvas key: %s", st.session_state.canvas_key)
+            
+            st.rerun()
+    
+    with col2:
+        if st.button("🔄 Reset Drawings", use_container_width=True, disabled=locked):
+            # Reset manual rectangles and restore original AI detections
+            st.session_state.manual_df = empty_items_frame()
+            st.session_state.canvas_key += 1
+            st.session_state.editor_version += 1
+            
+            # Restore workflow state to only AI items
+            if "original_ai_detections" in st.session_state:
+                st.session_state.workflow_state["sensitive_data"] = st.session_state.original_ai_detections
+            
+            st.rerun()
+
+
+def items_to_frame(items: List[Dict]) -> "pd.DataFrame":
+    """Flatten sensitive items into a table with one column per bbox coordinate."""
+    import pandas as pd
+
+    rows = [
+        [item.get("page_number", 1), item.get("content", ""), item.get("reason", "")]
+        + [float(item.get("bbox", {}).get(k, 0.0)) for k in BBOX_KEYS]
+        for item in items
+    ]
+    return pd.DataFrame(rows, columns=ITEM_COLUMNS)
+
+
+def as_manual_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Cast a manual-selection table to its compact column types."""
+    return df.astype(MANUAL_DTYPES)
+
+
+def empty_items_frame() -> "pd.DataFrame":
+    """An items table with no rows; manual selections start out as this."""
+    return as_manual_frame(items_to_frame([]))
+
+
+def append_item_rows(df: "pd.DataFrame", rows: List[List[Any]]) -> "pd.DataFrame":
+    """Return ``df`` with ``rows`` (in ITEM_COLUMNS order) appended."""
+    import pandas as pd
+
+    new = as_manual_frame(pd.DataFrame(rows, columns=ITEM_COLUMNS))
+    return new if df.empty else pd.concat([df, new], ignore_index=True)
+
+
+def fill_item_defaults(df: "pd.DataFrame", default_content: str = "", default_reason: str = "") -> "pd.DataFrame":
+    """Fill the blanks left by rows added in st.data_editor."""
+    return df.fillna({"page_number": 1, "content": default_content, "reason": default_reason,
+                      "x0": 0.0, "y0": 0.0, "x1": 0.0, "y1": 0.0})
+
+
+def frame_to_items(df: "pd.DataFrame", default_content: str = "", default_reason: str = "") -> List[Dict]:
+    """Rebuild sensitive item dicts (with nested bbox) from an edited table."""
+    df = fill_item_defaults(df, default_content, default_reason)
+    return [
+        {
+            "page_number": int(row["page_number"]),
+            "content": str(row["content"]),
+            "reason": str(row["reason"]),
+            "bbox": {k: float(row[k]) for k in BBOX_KEYS}
+        }
+        for row in df.to_dict("records")
+    ]
+
+
+def manual_items() -> List[Dict]:
+    """Manual selections as item dicts, the shape the redactor nodes expect."""
+    return frame_to_items(st.session_state.manual_df, MANUAL_CONTENT, MANUAL_REASON)
+
+
+def render_items_editor(df: "pd.DataFrame", key: str) -> Optional["pd.DataFrame"]:
+    """Show an items table in one st.data_editor; return the edited table, or None if unchanged.
+
+    The widget key includes ``editor_version`` so that, once edits are written
+    back to session state, the editor starts fresh from the new data instead of
+    re-applying its stored edits on top of it.
+
+    While an approval job runs the table is shown read-only: the job already has
+    the items it redacts, so later edits would be silently dropped.
+    """
+    if approval_in_progress():
+        st.dataframe(df, hide_index=True, use_container_width=True)
+        return None
+    edited = st.data_editor(
+        df,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "page_number": st.column_config.NumberColumn("Page", min_value=1, step=1),
+            "content": st.column_config.TextColumn("Content"),
+            "reason": st.column_config.TextColumn("Reason"),
+            **{k: st.column_config.NumberColumn(k, format="%.1f") for k in BBOX_KEYS},
+        },
+        key=f"{key}_{st.session_state.editor_version}",
+    )
+    # Compare values, not dtypes, so a widget round trip that widens a column is not an edit
+    if edited.shape == df.shape and (edited.to_numpy() == df.to_numpy()).all():
+        return None
+    return edited
+
+
+@st.fragment
+def render_results_fragment():
+    """Render the detection results pane; edits here only rerun this fragment."""
+    st.subheader("📊 Detection Results")
+    
+    # AI detected items
+    ai_items = st.session_state.workflow_state.get("sensitive_data", [])
+    manual_df = st.session_state.manual_df
+    
+    logger.debug("🔧 DISPLAY DEBUG:")
+    logger.debug("   🤖 AI items: %s", len(ai_items))
+    logger.debug("   ✋ Manual items: %s", len(manual_df))
+    
+    # Editable AI items as a single table
+    if ai_items:
+        st.markdown("**🤖 AI Detected Items:**")
+        edited_ai = render_items_editor(items_to_frame(ai_items), "ai_editor")
+        if edited_ai is not None:
+            st.session_state.workflow_state["sensitive_data"] = frame_to_items(edited_ai)
+            st.session_state.editor_version += 1
+            st.rerun()
+        
+        st.markdown(f"**AI Items: {len(ai_items)}**")
+    else:
+        st.info("No AI detections yet")
+    
+    # Editable manual items as a single table
+    if not manual_df.empty:
+        st.markdown("**✋ Manual Selections:**")
+        edited_manual = render_items_editor(manual_df, "manual_editor")
+        if edited_manual is not None:
+            st.session_state.manual_df = as_manual_frame(
+                fill_item_defaults(edited_manual, MANUAL_CONTENT, MANUAL_REASON)
+            )
+            st.session_state.editor_version += 1
+            st.rerun()
+        
+        st.markdown(f"**Manual Items: {len(manual_df)}**")
+    else:
+        st.info("No manual selections yet")
+    
+    # Summary
+    total_items = len(ai_items) + len(manual_df)
+    if total_items > 0:
+        st.markdown(f"**📊 Total for Redaction: {total_items} items ({len(ai_items)} AI + {len(manual_df)} Manual)**")
 
 
 def main():
@@ -209,7 +910,7 @@ def main():
         st.sidebar.write(f"File Key: {st.session_state.get('current_file_key', 'None')}")
         st.sidebar.write(f"Workflow Running: {st.session_state.workflow_running}")
         st.sidebar.write(f"Canvas Key: {st.session_state.canvas_key}")
-        st.sidebar.write(f"Manual Rectangles: {len(st.session_state.manual_rectangles)}")
+        st.sidebar.write(f"Manual Rectangles: {len(st.session_state.manual_df)}")
         st.sidebar.write(f"Preview Approved: {st.session_state.preview_approved}")
         st.sidebar.write(f"Show Approval Buttons: {st.session_state.show_approval_buttons}")
         if st.session_state.workflow_state:
@@ -239,32 +940,47 @@ def main():
         )
         
         if uploaded_file is not None:
-            # Create a unique key for this file to detect changes
-            file_key = f"{uploaded_file.name}_{uploaded_file.size}"
+            # Content-addressed key: re-uploading the same bytes keeps every cache warm
+            digest = upload_digest(uploaded_file)
+            file_key = f"{uploaded_file.name}_{digest[:12]}"
             
             # Only process if it's a new file
             if st.session_state.get("current_file_key") != file_key:
+                # Drop the previous document's OCR payloads and checkpoint, and detach its approval job
+                release_workflow_artifacts()
+                discard_approval_job()
+                st.session_state.downloaded = None
+                
                 # Save uploaded file to output/original/ folder
-                original_dir = os.path.join(os.getcwd(), "output", "original")
-                os.makedirs(original_dir, exist_ok=True)
-                pdf_path = os.path.join(original_dir, uploaded_file.name)
+                original_dir = OUTPUT_BASE / "original"
+                original_dir.mkdir(parents=True, exist_ok=True)
+                pdf_path = str(original_dir / uploaded_file.name)
                 
-                with open(pdf_path, "wb") as f:
-                    f.write(uploaded_file.getvalue())
+                # Skip the write when this exact file is already on disk
+                if not (
+                    os.path.exists(pdf_path)
+                    and os.path.getsize(pdf_path) == uploaded_file.size
+                    and _file_md5(pdf_path) == digest
+                ):
+                    with open(pdf_path, "wb") as f:
+                        f.write(uploaded_file.getvalue())
                 
-                # Load PDF
+                # Load PDF (documents from previous uploads are released by the cache)
                 if st.session_state.pdf_doc is not None:
-                    st.session_state.pdf_doc.close()
+                    get_pdf_doc.clear()
                 
-                st.session_state.pdf_doc = fitz.open(pdf_path)
+                st.session_state.pdf_doc = get_pdf_doc(pdf_path, os.path.getmtime(pdf_path))
                 st.session_state.workflow_state = {"pdf_path": pdf_path}
                 st.session_state.current_page = 0
-                st.session_state.manual_rectangles = []
+                st.session_state.manual_df = empty_items_frame()
                 st.session_state.preview_approved = False
                 st.session_state.show_approval_buttons = False
                 st.session_state.workflow_running = False
+                st.session_state.approval_summary = None
                 st.session_state.current_file_key = file_key
-                st.rerun()
+                # Checkpoint thread per upload; the uuid keeps concurrent sessions apart
+                st.session_state.workflow_thread_id = f"{file_key}_{uuid.uuid4().hex[:8]}"
+                # Everything below reads the new state in this same run; no rerun needed
             
             # Get the current PDF path for use below
             pdf_path = st.session_state.workflow_state.get("pdf_path")
@@ -295,6 +1011,14 @@ def main():
             placeholder="Example: Detect and redact all personal names, SSNs, addresses, and phone numbers in this PDF"
         )
         
+        # Start Azure OCR once a prompt is entered, so it overlaps with the user clicking Run.
+        # Uploading alone (e.g. for manual-only redaction) never sends the PDF to the cloud.
+        prewarm_path = st.session_state.workflow_state.get("pdf_path")
+        if (uploaded_file is not None and prewarm_path and detection_prompt.strip()
+                and st.session_state.get("ocr_prewarm_key") != st.session_state.current_file_key):
+            nodes.prewarm_ocr(prewarm_path)
+            st.session_state.ocr_prewarm_key = st.session_state.current_file_key
+        
         # Run Detection Button
         run_detection = st.button(
             "🚀 Run Detection",
@@ -356,247 +1080,29 @@ def main():
         col1, col2 = st.columns([3, 1])
         
         with col1:
-            st.subheader("📄 PDF Canvas")
-            
-            # Page navigation
-            total_pages = len(st.session_state.pdf_doc)
-            if total_pages > 1:
-                nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
-                
-                with nav_col1:
-                    if st.button("⬅️ Previous", disabled=st.session_state.current_page == 0):
-                        st.session_state.current_page = max(0, st.session_state.current_page - 1)
-                        st.session_state.canvas_key += 1
-                        st.rerun()
-                
-                with nav_col2:
-                    st.markdown(f"**Page {st.session_state.current_page + 1} of {total_pages}**")
-                
-                with nav_col3:
-                    if st.button("Next ➡️", disabled=st.session_state.current_page >= total_pages - 1):
-                        st.session_state.current_page = min(total_pages - 1, st.session_state.current_page + 1)
-                        st.session_state.canvas_key += 1
-                        st.rerun()
-            
-            # Load current page - use preview PDF if available, otherwise original
-            current_page = st.session_state.current_page
-            
-            # Use original PDF for canvas
-            page_image = load_pdf_page_as_image(st.session_state.pdf_doc, current_page, CANVAS_WIDTH)
-            page_rect = st.session_state.pdf_doc[current_page].rect
-            
-            # Create canvas objects for existing detections
-            sensitive_items = st.session_state.workflow_state.get("sensitive_data", [])
-            canvas_objects = create_canvas_objects(sensitive_items, st.session_state.manual_rectangles, current_page, page_rect)
-            
-            # Canvas for PDF display and manual drawing
-            canvas_result = st_canvas(
-                fill_color="rgba(0, 255, 0, 0.3)",  # Green with transparency
-                stroke_width=2,
-                stroke_color="#00FF00",
-                background_image=page_image,
-                update_streamlit=True,
-                width=CANVAS_WIDTH,
-                height=CANVAS_HEIGHT,
-                drawing_mode="rect",
-                point_display_radius=0,
-                key=f"canvas_{st.session_state.canvas_key}",
-                initial_drawing={
-                    "version": "4.4.0",
-                    "objects": canvas_objects
-                }
-            )
-            
-            # Process canvas drawings IMMEDIATELY after canvas render
-            # This ensures manual rectangles are captured before button logic runs
-            if canvas_result.json_data is not None:
-                objects = canvas_result.json_data["objects"]
-                print(f"🔧 CANVAS DEBUG:")
-                print(f"   📊 Canvas objects found: {len(objects)}")
-                
-                # Debug: Show all objects
-                for i, obj in enumerate(objects):
-                    print(f"   [{i+1}] Object type: {obj.get('type')}, stroke: {obj.get('stroke')}, fill: {obj.get('fill')}")
-                
-                new_rectangles = [obj for obj in objects if obj["type"] == "rect" and obj.get("stroke") == "#00FF00"]
-                print(f"   🟢 Green rectangles (manual): {len(new_rectangles)}")
-                
-                # Only process if we have new rectangles and they're not already processed
-                current_manual_count = len(st.session_state.manual_rectangles)
-                print(f"   📋 Current manual_rectangles in state: {current_manual_count}")
-                
-                # Convert new rectangles to PDF coordinates
-                for i, rect in enumerate(new_rectangles):
-                    print(f"   ✏️ Processing rectangle {i+1}: {rect}")
-                    
-                    pdf_coords = canvas_to_pdf_coordinates(rect, page_rect, CANVAS_WIDTH, CANVAS_HEIGHT)
-                    print(f"   📍 Converted coordinates: {pdf_coords}")
-                    
-                    manual_item = {
-                        "page_number": current_page + 1,
-                        "content": "[Manual Selection]",
-                        "reason": "Manually selected sensitive area",
-                        "bbox": pdf_coords
-                    }
-                    
-                    # Check if this rectangle is already in manual_rectangles
-                    is_duplicate = False
-                    for existing in st.session_state.manual_rectangles:
-                        if (existing["page_number"] == manual_item["page_number"] and
-                            abs(existing["bbox"]["x0"] - manual_item["bbox"]["x0"]) < 5 and
-                            abs(existing["bbox"]["y0"] - manual_item["bbox"]["y0"]) < 5):
-                            is_duplicate = True
-                            print(f"   ⚠️ Duplicate detected, skipping")
-                            break
-                    
-                    if not is_duplicate:
-                        st.session_state.manual_rectangles.append(manual_item)
-                        print(f"   ✅ Added manual item to state: {manual_item}")
-                        # Force immediate state update
-                        st.session_state.manual_rectangles = st.session_state.manual_rectangles
-                    
-                print(f"   📋 Final manual_rectangles count: {len(st.session_state.manual_rectangles)}")
-            else:
-                print(f"🔧 CANVAS DEBUG: No canvas data available")
-            
-            # Manual drawing controls
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("✅ Confirm Manual Selections", use_container_width=True):
-                    # Just refresh to ensure manual rectangles are captured
-                    manual_count = len(st.session_state.manual_rectangles)
-                    
-                    print(f"🔧 MANUAL SELECTIONS DEBUG:")
-                    print(f"   📊 Manual rectangles found: {manual_count}")
-                    print(f"   📋 Full manual_rectangles data: {st.session_state.manual_rectangles}")
-                    
-                    if manual_count > 0:
-                        st.success(f"✅ Found {manual_count} manual selection(s)")
-                        for i, rect in enumerate(st.session_state.manual_rectangles):
-                            print(f"   [{i+1}] Page {rect.get('page_number')}: {rect.get('bbox')}")
-                            print(f"       Content: {rect.get('content')}")
-                            print(f"       Reason: {rect.get('reason')}")
-                    else:
-                        st.info("ℹ️ No manual selections found. Draw rectangles on sensitive areas.")
-                        print(f"   🔍 Session state keys: {list(st.session_state.keys())}")
-                        print(f"   🔍 Canvas key: {st.session_state.canvas_key}")
-                    
-                    st.rerun()
-            
-            with col2:
-                if st.button("🔄 Reset Drawings", use_container_width=True):
-                    # Reset manual rectangles and restore original AI detections
-                    st.session_state.manual_rectangles = []
-                    st.session_state.canvas_key += 1
-                    
-                    # Restore workflow state to only AI items
-                    if "original_ai_detections" in st.session_state:
-                        st.session_state.workflow_state["sensitive_data"] = st.session_state.original_ai_detections
-                    
-                    st.rerun()
+            render_canvas_fragment()
         
         with col2:
-            st.subheader("📊 Detection Results")
-            
-            # AI detected items
-            ai_items = st.session_state.workflow_state.get("sensitive_data", [])
-            manual_items = st.session_state.manual_rectangles
-            
-            print(f"🔧 DISPLAY DEBUG:")
-            print(f"   🤖 AI items: {len(ai_items)}")
-            print(f"   ✋ Manual items: {len(manual_items)}")
-            
-            # Editable AI items with expanders
-            if ai_items:
-                st.markdown("**🤖 AI Detected Items:**")
-                for idx, item in enumerate(ai_items):
-                    with st.expander(f"AI Item {idx+1}: {item.get('content', '')[:40]} (Page {item.get('page_number', 1)})"):
-                        new_content = st.text_input("Content", value=item.get("content", ""), key=f"ai_content_{idx}")
-                        new_reason = st.text_input("Reason", value=item.get("reason", ""), key=f"ai_reason_{idx}")
-                        page = st.number_input("Page", value=int(item.get("page_number", 1)), min_value=1, key=f"ai_page_{idx}")
-                       
-                        bbox = item.get("bbox", {"x0": 0, "y0": 0, "x1": 0, "y1": 0})
-                        st.markdown("**Coordinates (PDF points):**")
-                        x0 = st.number_input("x0", value=float(bbox.get("x0", 0)), key=f"ai_x0_{idx}")
-                        y0 = st.number_input("y0", value=float(bbox.get("y0", 0)), key=f"ai_y0_{idx}")
-                        x1 = st.number_input("x1", value=float(bbox.get("x1", 0)), key=f"ai_x1_{idx}")
-                        y1 = st.number_input("y1", value=float(bbox.get("y1", 0)), key=f"ai_y1_{idx}")
-                        
-                        if st.button("✅ Apply Changes", key=f"ai_apply_{idx}"):
-                            # Update the AI item in workflow state's sensitive_data
-                            if "sensitive_data" not in st.session_state.workflow_state:
-                                st.session_state.workflow_state["sensitive_data"] = []
-                            
-                            st.session_state.workflow_state["sensitive_data"][idx] = {
-                                "page_number": int(page),
-                                "content": new_content,
-                                "reason": new_reason,
-                                "bbox": {"x0": x0, "y0": y0, "x1": x1, "y1": y1}
-                            }
-                            st.success("✅ AI item updated in workflow state!")
-                            st.rerun()
-                        
-                        if st.button("🗑️ Delete Item", key=f"ai_delete_{idx}"):
-                            if "sensitive_data" in st.session_state.workflow_state and idx < len(st.session_state.workflow_state["sensitive_data"]):
-                                del st.session_state.workflow_state["sensitive_data"][idx]
-                                st.success("🗑️ AI item deleted from workflow state!")
-                                st.rerun()
-                
-                st.markdown(f"**AI Items: {len(ai_items)}**")
-            else:
-                st.info("No AI detections yet")
-            
-            # Editable manual items with expanders
-            if manual_items:
-                st.markdown("**✋ Manual Selections:**")
-                for idx, item in enumerate(manual_items):
-                    with st.expander(f"Manual Item {idx+1}: Page {item.get('page_number', 1)}"):
-                        new_content = st.text_input("Content", value=item.get("content", "[Manual Selection]"), key=f"manual_content_{idx}")
-                        new_reason = st.text_input("Reason", value=item.get("reason", "Manually selected sensitive area"), key=f"manual_reason_{idx}")
-                        page = st.number_input("Page", value=int(item.get("page_number", 1)), min_value=1, key=f"manual_page_{idx}")
-                        
-                        bbox = item.get("bbox", {"x0": 0, "y0": 0, "x1": 0, "y1": 0})
-                        st.markdown("**Coordinates (PDF points):**")
-                        x0 = st.number_input("x0", value=float(bbox.get("x0", 0)), key=f"manual_x0_{idx}")
-                        y0 = st.number_input("y0", value=float(bbox.get("y0", 0)), key=f"manual_y0_{idx}")
-                        x1 = st.number_input("x1", value=float(bbox.get("x1", 0)), key=f"manual_x1_{idx}")
-                        y1 = st.number_input("y1", value=float(bbox.get("y1", 0)), key=f"manual_y1_{idx}")
-                        
-                        if st.button("✅ Apply Changes", key=f"manual_apply_{idx}"):
-                            # Update the manual item
-                            st.session_state.manual_rectangles[idx] = {
-                                "page_number": int(page),
-                                "content": new_content,
-                                "reason": new_reason,
-                                "bbox": {"x0": x0, "y0": y0, "x1": x1, "y1": y1}
-                            }
-                            st.success("✅ Manual item updated successfully!")
-                            st.rerun()
-                        
-                        if st.button("🗑️ Delete Item", key=f"manual_delete_{idx}"):
-                            del st.session_state.manual_rectangles[idx]
-                            st.success("🗑️ Manual item deleted successfully!")
-                            st.rerun()
-                
-                st.markdown(f"**Manual Items: {len(manual_items)}**")
-            else:
-                st.info("No manual selections yet")
-            
-            # Summary
-            total_items = len(ai_items) + len(manual_items)
-            if total_items > 0:
-                st.markdown(f"**📊 Total for Redaction: {total_items} items ({len(ai_items)} AI + {len(manual_items)} Manual)**")
+            render_results_fragment()
+    
+    # Background approval in progress
+    if st.session_state.get("approval_job") is not None:
+        st.divider()
+        render_approval_progress()
     
     # Human-in-the-Loop Approval Section
     if st.session_state.show_approval_buttons and not st.session_state.preview_approved:
         st.divider()
         st.subheader("👤 Human Review")
         
+        if st.session_state.get("approval_error"):
+            st.error(f"❌ Workflow error: {st.session_state.approval_error}")
+        
         st.info("📋 Please review the highlighted sensitive items above. You can:")
         st.markdown("- ✅ **Approve Preview** → AI redaction first, then manual redactions applied on top")
         st.markdown("- ❌ **Reject Preview** → Provide more hints and re-run detection")
         
-        manual_count = len(st.session_state.manual_rectangles)
+        manual_count = len(st.session_state.manual_df)
         if manual_count > 0:
             st.markdown(f"- ✂️ **Manual Only** → Skip AI, redact only your {manual_count} manual selection(s)")
         
@@ -611,119 +1117,36 @@ def main():
             if st.button("✅ Approve Preview", type="primary", use_container_width=True):
                 # Only process AI workflow - manual redactions will be applied separately
                 ai_items = st.session_state.workflow_state.get("sensitive_data", [])
-                manual_count = len(st.session_state.manual_rectangles)
+                manual_count = len(st.session_state.manual_df)
                 
-                print(f"🔧 APPROVE PREVIEW DEBUG:")
-                print(f"   🤖 AI items for workflow: {len(ai_items)}")
-                print(f"   ✋ Manual rectangles (separate): {manual_count}")
-                print(f"   📋 Manual rectangles data: {st.session_state.manual_rectangles}")
+                logger.debug("🔧 APPROVE PREVIEW DEBUG:")
+                logger.debug("   🤖 AI items for workflow: %s", len(ai_items))
+                logger.debug("   ✋ Manual rectangles (separate): %s", manual_count)
+                logger.debug("   📋 Manual rectangles data:\n%s", st.session_state.manual_df)
                 
                 # Debug: Check if manual rectangles exist
                 if manual_count > 0:
-                    print(f"   ✅ Manual count > 0, will proceed with combined redaction")
-                    for i, rect in enumerate(st.session_state.manual_rectangles):
-                        print(f"   📍 Manual rectangle {i+1}: Page {rect.get('page_number')}, BBox: {rect.get('bbox')}")
+                    logger.debug("   ✅ Manual count > 0, will proceed with combined redaction")
                 else:
-                    print(f"   ❌ Manual count is 0, will skip manual redaction step")
+                    logger.debug("   ❌ Manual count is 0, will skip manual redaction step")
                 
                 st.session_state.workflow_state["user_approval"] = "Yes"
                 st.session_state.preview_approved = True
                 st.session_state.show_approval_buttons = False
+                st.session_state.approval_error = None
+                st.session_state.downloaded = None
                 
-                # Step 1: Resume workflow from HumanInLoop to continue to Redactor
-                with st.spinner("🔄 Generating AI redacted PDF..."):
-                    try:
-                        # Build the workflow graph and compile without interrupt for redaction
-                        from nodes.orchestrator import build_sanitizer_graph
-                        graph = build_sanitizer_graph()
-                        app = graph.compile()  # No interrupt for redaction phase
-                        
-                        # Continue directly from HITL to Redactor
-                        print(f"🔧 CONTINUING FROM HITL TO REDACTOR:")
-                        print(f"   📊 Current state keys: {list(st.session_state.workflow_state.keys())}")
-                        print(f"   🤖 AI items (user-edited): {len(st.session_state.workflow_state.get('sensitive_data', []))}")
-                        print(f"   ✅ User approval: {st.session_state.workflow_state.get('user_approval')}")
-                        
-                        # Force workflow to start from HumanInLoop and continue to Redactor
-                        from nodes.hitl_node import run_hitl
-                        from nodes.redactor_node import run_redactor
-                        
-                        print(f"   🔄 Step 1: Running HITL node directly")
-                        hitl_result = run_hitl(st.session_state.workflow_state)
-                        print(f"   📋 HITL result next_node: {hitl_result.get('next_node')}")
-                        
-                        if hitl_result.get('next_node') == 'Redactor':
-                            print(f"   🔄 Step 2: Running Redactor node directly")
-                            redactor_result = run_redactor(hitl_result)
-                            st.session_state.workflow_state = redactor_result
-                            ai_redacted_path = redactor_result.get('final_pdf_path')
-                            print(f"   📁 Final PDF path from redactor: {ai_redacted_path}")
-                        else:
-                            print(f"   ❌ HITL did not route to Redactor, got: {hitl_result.get('next_node')}")
-                            ai_redacted_path = None
-                        
-                        if not ai_redacted_path:
-                            st.error("❌ AI workflow failed to produce redacted PDF")
-                            return
-                        
-                        print(f"🔧 WORKFLOW SEQUENCE:")
-                        print(f"   ✅ Step 1: AI workflow completed → {ai_redacted_path}")
-                        st.success(f"✅ Step 1: AI redaction completed! {len(ai_items)} items redacted")
-                        st.info(f"📁 AI-redacted file saved: `{ai_redacted_path}`")
-                        
-                        # Step 2: Apply manual redactions on top of AI-redacted PDF
-                        if manual_count > 0:
-                            with st.spinner("🔄 Step 2: Applying manual redactions on AI-redacted PDF..."):
-                                print(f"   🔄 Step 2: Applying {manual_count} manual redactions on AI result")
-                                final_path = combine_ai_and_manual_redactions(ai_redacted_path, st.session_state.manual_rectangles)
-                                
-                                # Update the final path in workflow state
-                                st.session_state.workflow_state["final_pdf_path"] = final_path
-                                print(f"   ✅ Step 2: Combined redaction completed → {final_path}")
-                                st.success(f"✅ Step 2: Manual redactions applied! Final PDF ready for download.")
-                                st.info(f"📁 Combined file saved: `{final_path}`")
-                                
-                                # Show file structure
-                                output_base = os.path.join(os.getcwd(), "output")
-                                if os.path.exists(output_base):
-                                    st.markdown("**📂 Files created in `output/` directory:**")
-                                    
-                                    # Show original files
-                                    original_dir = os.path.join(output_base, "original")
-                                    if os.path.exists(original_dir):
-                                        original_files = [f for f in os.listdir(original_dir) if f.endswith('.pdf')]
-                                        if original_files:
-                                            st.markdown("**📁 original/**")
-                                            for file in sorted(original_files):
-                                                st.markdown(f"  - `{file}`")
-                                    
-                                    # Show preview files
-                                    preview_dir = os.path.join(output_base, "preview")
-                                    if os.path.exists(preview_dir):
-                                        preview_files = [f for f in os.listdir(preview_dir) if f.endswith('.pdf')]
-                                        if preview_files:
-                                            st.markdown("**📁 preview/**")
-                                            for file in sorted(preview_files):
-                                                st.markdown(f"  - `{file}`")
-                                    
-                                    # Show redacted files
-                                    redacted_dir = os.path.join(output_base, "redacted")
-                                    if os.path.exists(redacted_dir):
-                                        redacted_files = [f for f in os.listdir(redacted_dir) if f.endswith('.pdf')]
-                                        if redacted_files:
-                                            st.markdown("**📁 redacted/**")
-                                            for file in sorted(redacted_files):
-                                                st.markdown(f"  - `{file}`")
-                        else:
-                            st.info("ℹ️ No manual selections to apply. AI redaction is final.")
-                        
-                        # Force immediate UI refresh to show download button
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"❌ Workflow error: {str(e)}")
-                        st.write("Debug info:", st.session_state.workflow_state.keys())
-                        st.rerun()
+                # HITL -> Redactor (AI items + manual boxes) runs on the worker pool; the UI polls for the result
+                st.session_state.approval_job = _pool().submit(
+                    run_approval,
+                    get_compiled_sanitizer_app(),
+                    workflow_config(),
+                    dict(st.session_state.workflow_state),
+                    manual_items(),
+                )
+                st.session_state.approval_counts = (len(ai_items), manual_count)
+                st.session_state.approval_job_thread = st.session_state.workflow_thread_id
+                st.rerun()
         
         with col2:
             if st.button("❌ Reject Preview", use_container_width=True):
@@ -734,14 +1157,16 @@ def main():
 
         with col3:
             # Manual-only redaction option
-            manual_count = len(st.session_state.manual_rectangles)
+            manual_count = len(st.session_state.manual_df)
             if manual_count > 0:
                 if st.button(f"✂️ Redact Manual Only ({manual_count})", use_container_width=True):
                     pdf_path = st.session_state.workflow_state.get("pdf_path")
                     if pdf_path:
                         with st.spinner("🔄 Applying manual redactions only..."):
                             try:
-                                final_path = apply_manual_redactions(pdf_path, st.session_state.manual_rectangles)
+                                from nodes.manual_redactor_node import apply_manual_redactions
+                                final_path = apply_manual_redactions(pdf_path, manual_items())
+                                st.session_state.downloaded = None
                                 st.session_state.workflow_state["final_pdf_path"] = final_path
                                 st.session_state.preview_approved = True
                                 st.session_state.show_approval_buttons = False
@@ -762,23 +1187,35 @@ def main():
         final_path = st.session_state.workflow_state["final_pdf_path"]
         
         if os.path.exists(final_path):
-            with open(final_path, "rb") as file:
+            final_mtime = os.path.getmtime(final_path)
+            if st.session_state.get("downloaded") == (final_path, final_mtime):
+                # Bytes were released after the download; load them again only on request
+                st.info("📥 Redacted PDF downloaded.")
+                if st.button("📥 Download Again", use_container_width=True):
+                    st.session_state.downloaded = None
+                    st.rerun()
+            else:
                 st.download_button(
                     label="📥 Download Redacted PDF",
-                    data=file.read(),
+                    data=_final_pdf_bytes(final_path, final_mtime),
                     file_name=f"redacted_{uploaded_file.name}",
                     mime="application/pdf",
                     type="primary",
-                    use_container_width=True
+                    use_container_width=True,
+                    on_click=_on_download,
+                    args=(final_path, final_mtime),
                 )
             
             st.success("✅ PDF successfully redacted! All sensitive information has been replaced with black boxes.")
+            render_approval_summary(st.session_state.get("approval_summary"))
             
             # Add button to start over with a new document
             col1, col2, col3 = st.columns([1, 1, 1])
             with col2:
                 if st.button("🔄 Process New Document", type="secondary", use_container_width=True):
                     # Clear all session state to start fresh
+                    release_workflow_artifacts()
+                    discard_approval_job()
                     for key in list(st.session_state.keys()):
                         del st.session_state[key]
                     st.rerun()
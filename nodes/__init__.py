@@ -1,9 +1,26 @@
-from .orchestrator import build_sanitizer_graph
-from .detector_node import run_detector
+from importlib import import_module
+from typing import Any
 
-__all__ = [
-    "build_sanitizer_graph",
-    "run_detector",
-]
+# Exports resolve on first access (PEP 562) so importing the package does not
+# pull in LangGraph, PyMuPDF and the LLM SDKs until a node is actually used.
+_EXPORTS = {
+    "FITZ_LOCK": ".state",
+    "build_sanitizer_graph": ".orchestrator",
+    "prewarm_ocr": ".detector_node",
+    "redact_batch": ".redactor_node",
+    "run_detector": ".detector_node",
+    "run_detector_batch": ".detector_node",
+    "run_hitl": ".hitl_node",
+    "run_redactor": ".redactor_node",
+}
 
+__all__ = list(_EXPORTS)
 
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -13,11 +13,24 @@ Case 2 (Feedback loop):
 1. Skip OCR (already done)
 2. First LLM: Re-analyze with feedback
 3. Second LLM: Re-map with updated sensitive content
+
+By default steps 3-4 run as one fused LLM call over the word-level OCR;
+set REDACTFLOW_DETECTOR_MODE=dual for the two-call path.
 """
 
+import hashlib
+import json
 import os
-from typing import List, Dict, Any, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import string
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
 
 # Load environment variables from .env if present
 try:
@@ -31,7 +44,92 @@ from azure.core.credentials import AzureKeyCredential
 from azure.ai.documentintelligence import DocumentIntelligenceClient
 from azure.ai.documentintelligence.models import AnalyzeResult
 
-from .model import AzureLLM
+from .model import get_llm
+from .state import FITZ_LOCK, get_page_text
+
+# Azure DI models used for the two OCR passes
+PAGE_OCR_MODEL = "prebuilt-read"
+WORD_OCR_MODEL = "prebuilt-layout"
+
+# Seconds between LRO status polls when Azure sends no Retry-After (SDK default is 5)
+DI_POLLING_INTERVAL = float(os.getenv("AZURE_DI_POLLING_INTERVAL", "1"))
+
+# Upper bound on in-flight Azure DI analyses across all passes (service default is 15 TPS)
+DI_MAX_CONCURRENCY = int(os.getenv("AZURE_DI_TPS", "10"))
+_DI_SEMAPHORE = threading.BoundedSemaphore(DI_MAX_CONCURRENCY)
+
+# PDFs with at least this many pages are analyzed one page per request, concurrently
+DI_SPLIT_MIN_PAGES = 3
+
+# OCR results are cached on disk by PDF content hash + model id. The files hold the
+# document text in plaintext: set REDACTFLOW_OCR_CACHE_DIR="" to disable the cache.
+OCR_CACHE_DIR = os.getenv("REDACTFLOW_OCR_CACHE_DIR", os.path.join(".cache", "ocr"))
+
+# Disk cache entries older than this are ignored and deleted (seconds, default 24h)
+CACHE_MAX_AGE = float(os.getenv("REDACTFLOW_CACHE_MAX_AGE", str(24 * 3600)))
+
+# OCR started ahead of detection (prewarm_ocr), keyed by PDF sha256; bounded to recent uploads
+PREWARM_MAX_ENTRIES = 4
+_prewarm_futures: "OrderedDict[str, Future]" = OrderedDict()
+_prewarm_lock = threading.Lock()
+_prewarm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ocr-prewarm")
+
+# First-LLM results are cached by a hash of the exact prompt (memory, then disk).
+# The disk tier stores detected values in plaintext: REDACTFLOW_LLM_CACHE_DIR="" keeps it memory-only.
+LLM_CACHE_DIR = os.getenv("REDACTFLOW_LLM_CACHE_DIR", os.path.join(".cache", "llm"))
+FIRST_LLM_MEMORY_ENTRIES = 64
+_first_llm_memo: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_first_llm_memo_lock = threading.Lock()
+
+# "fused" detects and localizes in one LLM call; "dual" keeps the two-call path for A/B checks
+DETECTOR_MODE = os.getenv("REDACTFLOW_DETECTOR_MODE", "fused").strip().lower()
+
+# Debug switch: send every item to the coordinate-mapping LLM, even exact word matches
+FORCE_LLM_MAPPING = os.getenv("REDACTFLOW_FORCE_LLM_MAPPING", "").lower() in ("1", "true", "yes")
+
+
+# LLM instructions are constant apart from the guidance bullets
+_FUSED_LLM_INSTRUCTION = string.Template(
+    "You are a specialized LLM for identifying sensitive information in PDF documents and "
+    "locating it precisely. You must be SKEPTICAL and follow the sensitive data description to increase recall. "
+    "Add as much sensitive information as you think should be sensitive based on the guidance.\n\n"
+    "Guidance for sensitive data detection:\n$guidance\n\n"
+    "The document is given as word elements per page, each as {\"id\": element_id, \"c\": word content}, "
+    "in reading order.\n\n"
+    "For each sensitive VALUE, return the exact value content, its page number, a clear reason, and the "
+    "element_ids of the words that make up the value.\n\n"
+    "CRITICAL MAPPING RULES:\n"
+    "- Select ONLY the sensitive VALUES, NOT field labels like 'SEVIS ID:', 'NAME:', 'ADDRESS:'\n"
+    "- For multi-word values (like 'John Doe Smith'), include ALL element IDs for the complete value\n"
+    "- Group related value words together (avoid over-segmentation)\n"
+    "- Be thorough - it's better to flag more values than to miss sensitive data."
+)
+
+_FIRST_LLM_INSTRUCTION = string.Template(
+    "You are a specialized LLM for identifying sensitive information in PDF documents. "
+    "You must be SKEPTICAL and follow the sensitive data description to increase recall. "
+    "Add as much sensitive information as you think should be sensitive based on the guidance.\n\n"
+    "Guidance for sensitive data detection:\n$guidance\n\n"
+    "Extract the EXACT sensitive VALUES only, specify the page number, and provide a clear reason. "
+    "Be thorough - it's better to flag more values than to miss sensitive data."
+)
+
+_SECOND_LLM_INSTRUCTION = (
+    "You are a specialized LLM for mapping sensitive content to precise word coordinates. "
+    "For each sensitive content item, find the matching word element IDs that contain that information.\n\n"
+    "CRITICAL MAPPING RULES:\n"
+    "- Map ONLY the sensitive VALUES, NOT field labels\n"
+    "- Example: For 'N0004705512' → find element IDs for 'N0004705512' words only\n"
+    "- Example: For 'John Smith' → find element IDs for 'John' and 'Smith' words only\n"
+    "- DO NOT map field labels like 'SEVIS ID:', 'NAME:', 'ADDRESS:'\n"
+    "- For multi-word values (like 'John Doe Smith'), include ALL element IDs for the complete value\n"
+    "- For single word values, select the specific element_id for that word\n"
+    "- Be PRECISE - only select elements that contain the actual sensitive values\n"
+    "- Group related value words together (avoid over-segmentation)\n\n"
+    "Each word element is given as {\"id\": element_id, \"c\": word content}.\n\n"
+    "Extract the word-level coordinates for each sensitive VALUE and provide the exact value content, "
+    "reason, and list of element_ids that cover only the sensitive value (not labels)."
+)
 
 
 def run_detector(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -70,6 +168,36 @@ def run_detector(state: Dict[str, Any]) -> Dict[str, Any]:
         return result
 
 
+def run_detector_batch(pdf_paths: List[str], descriptions: List[str], max_workers: int = 4) -> List[Dict[str, Any]]:
+    """
+    Run the detector over several PDFs concurrently.
+    
+    Azure DI requests from all documents share the _DI_SEMAPHORE cap, and the
+    OCR cache and clients are shared too. Returns one result per path, in input
+    order: {"pdf_path", "status": "ok" | "error", "sensitive_data", "error"}.
+    A failing document does not abort the batch.
+    """
+    def detect(pdf_path: str) -> Dict[str, Any]:
+        state = run_detector({"pdf_path": pdf_path, "sensitive_data_description": list(descriptions)})
+        if not state.get("word_level_pdf_elements"):
+            raise RuntimeError("OCR produced no word elements")
+        return state
+    
+    results: List[Dict[str, Any]] = [{} for _ in pdf_paths]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(detect, path): i for i, path in enumerate(pdf_paths)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                state = future.result()
+                results[i] = {"pdf_path": pdf_paths[i], "status": "ok", "sensitive_data": state.get("sensitive_data", []), "error": None}
+            except Exception as e:
+                print(f"❌ Batch detection failed for {pdf_paths[i]}: {e}")
+                results[i] = {"pdf_path": pdf_paths[i], "status": "error", "sensitive_data": [], "error": str(e)}
+    
+    return results
+
+
 def _first_detection(state: Dict[str, Any], pdf_path: str, descriptions: List[str]) -> Dict[str, Any]:
     """
     Case 1: First detection with dual OCR + dual LLM.
@@ -89,9 +217,12 @@ def _first_detection(state: Dict[str, Any], pdf_path: str, descriptions: List[st
         # Step 2: Store OCR results in state
         state["page_level_pdf_elements"] = page_elements
         state["word_level_pdf_elements"] = word_elements
+        # Fresh OCR: derive page text and the word payload again
+        state.pop("_page_text_joined", None)
+        state.pop("_word_elements_json", None)
         
-        # Step 3: Run dual LLM analysis
-        sensitive_data = _run_dual_llm_analysis(page_elements, word_elements, descriptions)
+        # Step 3: Run LLM analysis
+        sensitive_data = _run_llm_analysis(state, word_elements, descriptions)
         state["sensitive_data"] = sensitive_data
         
         print(f"✅ Detector: Found {len(sensitive_data)} sensitive items")
@@ -116,8 +247,8 @@ def _feedback_detection(state: Dict[str, Any], descriptions: List[str]) -> Dict[
         
         print(f"📊 Using cached OCR: {len(page_elements)} page + {len(word_elements)} word elements")
         
-        # Run dual LLM with feedback
-        sensitive_data = _run_dual_llm_analysis(page_elements, word_elements, descriptions)
+        # Run LLM analysis with feedback (page text is reused across cycles)
+        sensitive_data = _run_llm_analysis(state, word_elements, descriptions)
         state["sensitive_data"] = sensitive_data
         
         print(f"✅ Detector feedback: Updated to {len(sensitive_data)} sensitive items")
@@ -133,26 +264,85 @@ def _run_dual_ocr_parallel(pdf_path: str) -> Tuple[List[Dict[str, Any]], List[Di
     Run dual OCR in parallel:
     1. Page-level OCR (prebuilt-read) for content analysis
     2. Word-level OCR (prebuilt-layout) for coordinate mapping
+    
+    The PDF is read once; each pass is served from the OCR cache when possible,
+    or from a run already started by prewarm_ocr.
+    """
+    with open(pdf_path, "rb") as f:
+        file_content = f.read()
+    digest = hashlib.sha256(file_content).hexdigest()
+    
+    with _prewarm_lock:
+        prewarmed = _prewarm_futures.pop(digest, None)
+    if prewarmed is not None:
+        try:
+            page_elements, word_elements = prewarmed.result()
+            if page_elements and word_elements:
+                print(f"♻️ Using prewarmed OCR for {digest[:12]}")
+                return page_elements, word_elements
+        except Exception as e:
+            print(f"⚠️ Prewarmed OCR failed, running it again: {e}")
+    
+    return _run_dual_ocr(file_content, digest)
+
+
+def prewarm_ocr(pdf_path: str) -> None:
+    """
+    Start OCR for an uploaded PDF in the background so it overlaps with the rest of
+    the user's detection request. run_detector picks the result up by content hash.
+
+    This sends the PDF to Azure: call it only once the user has asked for detection.
     """
-    client = _init_di_client()
+    try:
+        with open(pdf_path, "rb") as f:
+            file_content = f.read()
+    except OSError as e:
+        print(f"⚠️ Could not prewarm OCR: {e}")
+        return
+    digest = hashlib.sha256(file_content).hexdigest()
+    
+    with _prewarm_lock:
+        if digest in _prewarm_futures:
+            return
+        _prewarm_futures[digest] = _prewarm_executor.submit(_run_dual_ocr, file_content, digest)
+        while len(_prewarm_futures) > PREWARM_MAX_ENTRIES:
+            _prewarm_futures.popitem(last=False)
+
+
+def _run_dual_ocr(file_content: bytes, digest: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Run whichever OCR passes are not already cached for this content digest."""
+    page_elements = _load_cached_ocr(digest, PAGE_OCR_MODEL)
+    word_elements = _load_cached_ocr(digest, WORD_OCR_MODEL)
+    if page_elements is not None and word_elements is not None:
+        print(f"♻️ OCR cache hit for {digest[:12]}, skipping Azure DI")
+        return page_elements, word_elements
+    
+    client = _get_di_client()
+    # PyMuPDF work (splitting, page sizes) happens here, once, never in the OCR worker threads
+    try:
+        page_bodies = _split_pdf_pages(file_content, DI_SPLIT_MIN_PAGES)
+    except Exception as e:
+        print(f"⚠️ Could not split PDF, analyzing it in one request: {e}")
+        page_bodies = []
     
-    # Run both OCR operations in parallel
+    # Run the missing OCR operations in parallel
     with ThreadPoolExecutor(max_workers=2) as executor:
-        # Submit both OCR tasks
-        page_future = executor.submit(_run_page_level_ocr, client, pdf_path)
-        word_future = executor.submit(_run_word_level_ocr, client, pdf_path)
-        
-        # Collect results
-        page_elements = []
-        word_elements = []
+        page_future = None
+        word_future = None
+        if page_elements is None:
+            page_future = executor.submit(_run_page_level_ocr, client, file_content, page_bodies)
+        if word_elements is None:
+            word_future = executor.submit(
+                _run_word_level_ocr, client, file_content, page_bodies, _read_page_dims(file_content)
+            )
         
         try:
-            for future in as_completed([page_future, word_future]):
-                result = future.result()
-                if future == page_future:
-                    page_elements = result
-                elif future == word_future:
-                    word_elements = result
+            if page_future is not None:
+                page_elements = page_future.result()
+                _store_cached_ocr(digest, PAGE_OCR_MODEL, page_elements)
+            if word_future is not None:
+                word_elements = word_future.result()
+                _store_cached_ocr(digest, WORD_OCR_MODEL, word_elements)
         except Exception as e:
             print(f"❌ OCR parallel execution error: {e}")
             return [], []
@@ -160,25 +350,21 @@ def _run_dual_ocr_parallel(pdf_path: str) -> Tuple[List[Dict[str, Any]], List[Di
     return page_elements, word_elements
 
 
-def _run_page_level_ocr(client: DocumentIntelligenceClient, pdf_path: str) -> List[Dict[str, Any]]:
+def _run_page_level_ocr(
+    client: DocumentIntelligenceClient, file_content: bytes, page_bodies: List[bytes]
+) -> List[Dict[str, Any]]:
     """
     Page-level OCR using prebuilt-read for content analysis.
     Returns elements optimized for LLM reading.
     """
     try:
-        with open(pdf_path, "rb") as f:
-            file_content = f.read()
-        
         # Use prebuilt-read for page-level content
-        poller = client.begin_analyze_document("prebuilt-read", file_content, content_type="application/pdf")
-        result = poller.result()
+        pages = _analyze_pages(client, PAGE_OCR_MODEL, file_content, page_bodies)
         
         elements = []
         element_id = 0
         
-        for page in result.pages:
-            page_num = page.page_number
-            
+        for page_num, page in pages:
             # Extract paragraphs/lines for better content structure
             if hasattr(page, 'paragraphs') and page.paragraphs:
                 for paragraph in page.paragraphs:
@@ -212,71 +398,169 @@ def _run_page_level_ocr(client: DocumentIntelligenceClient, pdf_path: str) -> Li
         return []
 
 
-def _run_word_level_ocr(client: DocumentIntelligenceClient, pdf_path: str) -> List[Dict[str, Any]]:
+def _run_word_level_ocr(
+    client: DocumentIntelligenceClient, file_content: bytes, page_bodies: List[bytes], page_dims: np.ndarray
+) -> List[Dict[str, Any]]:
     """
     Word-level OCR using prebuilt-layout for coordinate mapping.
     Returns individual words with precise coordinates.
     """
     try:
-        with open(pdf_path, "rb") as f:
-            file_content = f.read()
-        
         # Use prebuilt-layout for word-level coordinates
-        poller = client.begin_analyze_document("prebuilt-layout", file_content, content_type="application/pdf")
-        result = poller.result()
+        pages = _analyze_pages(client, WORD_OCR_MODEL, file_content, page_bodies)
         
-        return _extract_word_elements(result, pdf_path)
+        return _extract_word_elements(pages, page_dims)
         
     except Exception as e:
         print(f"❌ Word-level OCR error: {e}")
         return []
 
 
-def _extract_word_elements(azure_result: AnalyzeResult, pdf_path: str) -> List[Dict[str, Any]]:
-    """Extract word-level elements and convert coordinates to PyMuPDF points."""
+def _analyze_document(client: DocumentIntelligenceClient, model_id: str, body: bytes) -> AnalyzeResult:
+    """One Azure DI analysis, gated by the shared concurrency limit."""
+    with _DI_SEMAPHORE:
+        poller = client.begin_analyze_document(
+            model_id, body, content_type="application/pdf", polling_interval=DI_POLLING_INTERVAL
+        )
+        return poller.result()
+
+
+def _split_pdf_pages(file_content: bytes, min_pages: int = 1) -> List[bytes]:
+    """Split a PDF into single-page PDF byte buffers; [] if it has fewer than ``min_pages`` pages."""
+    import fitz  # PyMuPDF
+    
+    with FITZ_LOCK:
+        src = fitz.open(stream=file_content, filetype="pdf")
+        try:
+            if len(src) < min_pages:
+                return []
+            pages = []
+            for i in range(len(src)):
+                single = fitz.open()
+                single.insert_pdf(src, from_page=i, to_page=i)
+                pages.append(single.tobytes())
+                single.close()
+            return pages
+        finally:
+            src.close()
+
+
+def _analyze_pages(
+    client: DocumentIntelligenceClient, model_id: str, file_content: bytes, page_bodies: List[bytes]
+) -> List[Tuple[int, Any]]:
+    """
+    Analyze a PDF and return (page_number, DocumentPage) pairs in page order.
+    
+    ``page_bodies`` comes from _split_pdf_pages: empty for short PDFs, which go in
+    one request; otherwise the single pages are analyzed concurrently, since DI
+    latency grows roughly linearly with page count.
+    """
+    if not page_bodies:
+        result = _analyze_document(client, model_id, file_content)
+        return [(page.page_number, page) for page in result.pages]
+    
+    with ThreadPoolExecutor(max_workers=min(len(page_bodies), DI_MAX_CONCURRENCY)) as executor:
+        results = list(executor.map(lambda body: _analyze_document(client, model_id, body), page_bodies))
+    
+    # Each split result holds a single page numbered 1; restore document numbering
+    return [(index + 1, page) for index, result in enumerate(results) for page in result.pages]
+
+
+def _read_page_dims(file_content: bytes) -> np.ndarray:
+    """(n_pages, 2) array of PyMuPDF page width/height in points, from a single open."""
     import fitz  # PyMuPDF
     
+    with FITZ_LOCK, fitz.open(stream=file_content, filetype="pdf") as doc:
+        return np.array([(page.rect.width, page.rect.height) for page in doc], dtype=float).reshape(-1, 2)
+
+
+def _extract_word_elements(pages: List[Tuple[int, Any]], page_dims: np.ndarray) -> List[Dict[str, Any]]:
+    """Extract word-level elements and convert coordinates to PyMuPDF points."""
     elements = []
-    doc = fitz.open(pdf_path)
     
-    try:
-        for page in azure_result.pages:
-            page_index = int(page.page_number) - 1
-            if not (0 <= page_index < len(doc)):
-                continue
-                
-            pdf_pt_w = float(doc[page_index].rect.width)
-            pdf_pt_h = float(doc[page_index].rect.height)
-            di_w = float(getattr(page, "width", 0.0) or 0.0)
-            di_h = float(getattr(page, "height", 0.0) or 0.0)
-            unit = getattr(page, "unit", None)
+    for page_number, page in pages:
+        page_index = int(page_number) - 1
+        if not (0 <= page_index < len(page_dims)):
+            continue
             
-            element_id = 0
-            for word in page.words:
-                polygon = list(getattr(word, "polygon", []) or [])
-                bbox = _polygon_to_bbox_points(polygon, unit, di_w, di_h, pdf_pt_w, pdf_pt_h)
-                element_id += 1
-                
-                elements.append({
-                    "element_id": element_id,
-                    "page_number": page.page_number,
-                    "content": word.content,
-                    "bbox": bbox,
-                })
-    finally:
-        doc.close()
+        pdf_pt_w, pdf_pt_h = page_dims[page_index].tolist()
+        di_w = float(getattr(page, "width", 0.0) or 0.0)
+        di_h = float(getattr(page, "height", 0.0) or 0.0)
+        unit = getattr(page, "unit", None)
+        
+        words = page.words or []
+        if not words:
+            continue
+        
+        # One unit scale per page, then all word boxes in a single vectorized pass
+        sx, sy = _unit_scale(unit, di_w, di_h, pdf_pt_w, pdf_pt_h)
+        bboxes = _polygons_to_bboxes([getattr(w, "polygon", None) or [] for w in words])
+        bboxes *= np.array([sx, sy, sx, sy])
+        
+        elements.extend(
+            {
+                "element_id": element_id,
+                "page_number": page_number,
+                "content": word.content,
+                "bbox": {"x0": x0, "y0": y0, "x1": x1, "y1": y1},
+            }
+            for element_id, (word, (x0, y0, x1, y1)) in enumerate(zip(words, bboxes.tolist()), start=1)
+        )
         
     return elements
 
 
-def _run_dual_llm_analysis(page_elements: List[Dict[str, Any]], word_elements: List[Dict[str, Any]], descriptions: List[str]) -> List[Dict[str, Any]]:
+def _run_llm_analysis(state: Dict[str, Any], word_elements: List[Dict[str, Any]], descriptions: List[str]) -> List[Dict[str, Any]]:
+    """Dispatch to the fused single-call detector or the dual-LLM path (REDACTFLOW_DETECTOR_MODE)."""
+    words_json = _word_elements_json(state)
+    if DETECTOR_MODE == "dual":
+        return _run_dual_llm_analysis(get_page_text(state), word_elements, words_json, descriptions)
+    return _fused_llm_analysis(word_elements, words_json, descriptions)
+
+
+def _fused_llm_analysis(word_elements: List[Dict[str, Any]], words_json: str, descriptions: List[str]) -> List[Dict[str, Any]]:
+    """
+    Single LLM: detect sensitive values and select their word element IDs in one call,
+    grounded only on the word-level OCR.
+    """
+    try:
+        from pydantic import BaseModel
+    except Exception:
+        return []
+    
+    class FusedItem(BaseModel):
+        page_number: int
+        content: str
+        reason: str
+        element_ids: List[int]  # Word element IDs that cover only the sensitive value
+    
+    class FusedOutput(BaseModel):
+        items: List[FusedItem]
+    
+    instruction = _render_instruction(_FUSED_LLM_INSTRUCTION, _guidance_text(descriptions))
+    
+    try:
+        llm = get_llm()
+        res: FusedOutput = llm.create_structured_response(
+            FusedOutput, instruction, '{"word_elements_by_page":' + words_json + "}"
+        )
+        sensitive_data = _locate_items(res.items or [], word_elements)
+        print(f"📍 Fused LLM found {len(sensitive_data)} sensitive items with coordinates")
+        return sensitive_data
+    
+    except Exception as e:
+        print(f"❌ Fused LLM error: {e}")
+        return []
+
+
+def _run_dual_llm_analysis(page_text: str, word_elements: List[Dict[str, Any]], words_json: str, descriptions: List[str]) -> List[Dict[str, Any]]:
     """
     Run dual LLM analysis:
     1. First LLM: Analyze page-level content for sensitive data
     2. Second LLM: Map sensitive content to word-level coordinates
     """
     # Step 1: First LLM - Content analysis
-    sensitive_content_items = _first_llm_content_analysis(page_elements, descriptions)
+    sensitive_content_items = _first_llm_content_analysis(page_text, descriptions)
     
     if not sensitive_content_items:
         print("⚠️ First LLM found no sensitive content")
@@ -285,14 +569,14 @@ def _run_dual_llm_analysis(page_elements: List[Dict[str, Any]], word_elements: L
     print(f"📝 First LLM found {len(sensitive_content_items)} sensitive content items")
     
     # Step 2: Second LLM - Coordinate mapping  
-    sensitive_data = _second_llm_coordinate_mapping(sensitive_content_items, word_elements)
+    sensitive_data = _second_llm_coordinate_mapping(sensitive_content_items, word_elements, words_json)
     
     print(f"📍 Second LLM mapped {len(sensitive_data)} items to coordinates")
     
     return sensitive_data
 
 
-def _first_llm_content_analysis(page_elements: List[Dict[str, Any]], descriptions: List[str]) -> List[Dict[str, Any]]:
+def _first_llm_content_analysis(page_text: str, descriptions: List[str]) -> List[Dict[str, Any]]:
     """
     First LLM: Analyze page-level content to identify sensitive information.
     """
@@ -309,38 +593,17 @@ def _first_llm_content_analysis(page_elements: List[Dict[str, Any]], description
     class ContentAnalysisOutput(BaseModel):
         items: List[SensitiveContentItem]
     
-    # Build guidance
-    guidance = "\n".join([f"- {d}" for d in descriptions]) if descriptions else (
-        "Detect all sensitive information including names, IDs, addresses, phone numbers, "
-        "financial amounts, dates, birth dates, signatures, student IDs, social security numbers."
-    )
+    instruction = _render_instruction(_FIRST_LLM_INSTRUCTION, _guidance_text(descriptions))
     
-    # Prepare page content for analysis
-    content_by_page = {}
-    for element in page_elements:
-        page_num = element.get("page_number", 1)
-        content = element.get("content", "")
-        if page_num not in content_by_page:
-            content_by_page[page_num] = []
-        content_by_page[page_num].append(content)
-    
-    # Build readable text for LLM
-    page_text = ""
-    for page_num in sorted(content_by_page.keys()):
-        page_content = "\n".join(content_by_page[page_num])
-        page_text += f"\n\n--- Page {page_num} ---\n\n{page_content}"
-    
-    instruction = (
-        "You are a specialized LLM for identifying sensitive information in PDF documents. "
-        "You must be SKEPTICAL and follow the sensitive data description to increase recall. "
-        "Add as much sensitive information as you think should be sensitive based on the guidance.\n\n"
-        f"Guidance for sensitive data detection:\n{guidance}\n\n"
-        "Extract the EXACT sensitive VALUES only, specify the page number, and provide a clear reason. "
-                "Be thorough - it's better to flag more values than to miss sensitive data."
-    )
+    # Unchanged page text + guidance across feedback cycles gives an identical prompt
+    cache_key = _first_llm_cache_key(instruction, page_text)
+    cached = _load_cached_first_llm(cache_key)
+    if cached is not None:
+        print(f"♻️ First LLM cache hit for {cache_key[:12]}")
+        return cached
     
     try:
-        llm = AzureLLM()
+        llm = get_llm()
         res: ContentAnalysisOutput = llm.create_structured_response(ContentAnalysisOutput, instruction, page_text)
         
         items = []
@@ -351,6 +614,7 @@ def _first_llm_content_analysis(page_elements: List[Dict[str, Any]], description
                 "reason": item.reason
             })
         
+        _store_cached_first_llm(cache_key, items)
         return items
 
     except Exception as e:
@@ -358,7 +622,7 @@ def _first_llm_content_analysis(page_elements: List[Dict[str, Any]], description
         return []
 
 
-def _second_llm_coordinate_mapping(sensitive_content_items: List[Dict[str, Any]], word_elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _second_llm_coordinate_mapping(sensitive_content_items: List[Dict[str, Any]], word_elements: List[Dict[str, Any]], words_json: str) -> List[Dict[str, Any]]:
     """
     Second LLM: Map sensitive content to word-level coordinates.
     """
@@ -376,95 +640,208 @@ def _second_llm_coordinate_mapping(sensitive_content_items: List[Dict[str, Any]]
     class CoordinateMappingOutput(BaseModel):
         items: List[CoordinateMappedItem]
     
-    # Prepare word elements by page
-    words_by_page = {}
-    for element in word_elements:
-        page_num = element.get("page_number", 1)
-        if page_num not in words_by_page:
-            words_by_page[page_num] = []
-        words_by_page[page_num].append({
-            "element_id": element.get("element_id"),
-            "content": element.get("content", ""),
-            "bbox": element.get("bbox", {})
-        })
+    bbox_index = {(e.get("page_number", 1), e.get("element_id")): e.get("bbox", {}) for e in word_elements}
+    
+    # Items whose words appear exactly once on their page need no LLM call
+    resolved_items, sensitive_content_items = _map_exact_matches(sensitive_content_items, word_elements, bbox_index)
+    if resolved_items:
+        print(f"⚡ Mapped {len(resolved_items)} items by exact word match")
+    if not sensitive_content_items:
+        return resolved_items
     
     # Prepare sensitive content for matching
     sensitive_items_str = []
     for item in sensitive_content_items:
         sensitive_items_str.append(f"Page {item.get('page_num', 1)}: '{item.get('sensitive_content', '')}' (Reason: {item.get('reason', '')})")
     
-    instruction = (
-        "You are a specialized LLM for mapping sensitive content to precise word coordinates. "
-        "For each sensitive content item, find the matching word element IDs that contain that information.\n\n"
-        "CRITICAL MAPPING RULES:\n"
-        "- Map ONLY the sensitive VALUES, NOT field labels\n"
-        "- Example: For 'N0004705512' → find element IDs for 'N0004705512' words only\n"
-        "- Example: For 'John Smith' → find element IDs for 'John' and 'Smith' words only\n"
-        "- DO NOT map field labels like 'SEVIS ID:', 'NAME:', 'ADDRESS:'\n"
-        "- For multi-word values (like 'John Doe Smith'), include ALL element IDs for the complete value\n"
-        "- For single word values, select the specific element_id for that word\n"
-        "- Be PRECISE - only select elements that contain the actual sensitive values\n"
-        "- Group related value words together (avoid over-segmentation)\n\n"
-        "Extract the word-level coordinates for each sensitive VALUE and provide the exact value content, "
-        "reason, and list of element_ids that cover only the sensitive value (not labels)."
+    # The LLM only picks IDs; bboxes stay local and are re-attached below.
+    # The word list is pre-serialized once per document (see _word_elements_json).
+    payload_json = (
+        '{"sensitive_items_to_map":' + json.dumps(sensitive_items_str, ensure_ascii=False, separators=(",", ":"))
+        + ',"word_elements_by_page":' + words_json + "}"
     )
     
-    payload = {
-        "sensitive_items_to_map": sensitive_items_str,
-        "word_elements_by_page": words_by_page
-    }
-    
     try:
-        llm = AzureLLM()
-        res: CoordinateMappingOutput = llm.create_structured_response(CoordinateMappingOutput, instruction, str(payload))
-        
-        # Convert to final format with actual coordinates
-        final_items = []
-        for item in res.items or []:
-            # Get actual coordinates from word elements
-            page_num = item.page_number
-            element_ids = item.element_ids or []
-            
-            if not element_ids:
-                continue
-            
-            # Find matching word elements
-            page_words = words_by_page.get(page_num, [])
-            matching_words = [w for w in page_words if w["element_id"] in element_ids]
-            
-            if not matching_words:
-                continue
-            
-            # Compute merged bounding box
-            if len(matching_words) == 1:
-                bbox = matching_words[0]["bbox"]
-            else:
-                bboxes = [w["bbox"] for w in matching_words]
-                bbox = {
-                    "x0": min(b["x0"] for b in bboxes),
-                    "y0": min(b["y0"] for b in bboxes),
-                    "x1": max(b["x1"] for b in bboxes),
-                    "y1": max(b["y1"] for b in bboxes)
-                }
-            
-            final_items.append({
-                "page_number": page_num,
-                "content": item.content,
-                "reason": item.reason,
-                "bbox": bbox
-            })
+        llm = get_llm()
+        res: CoordinateMappingOutput = llm.create_structured_response(
+            CoordinateMappingOutput, _SECOND_LLM_INSTRUCTION, payload_json
+        )
         
-        return final_items
+        # Attach actual coordinates from the word elements
+        return resolved_items + _locate_items(res.items or [], word_elements, bbox_index)
         
     except Exception as e:
         print(f"❌ Second LLM error: {e}")
-        return []
+        return resolved_items
+
+
+@lru_cache(maxsize=32)
+def _render_instruction(template: string.Template, guidance: str) -> str:
+    """Instruction text for a guidance block; repeated feedback cycles reuse the rendered string."""
+    return template.substitute(guidance=guidance)
+
+
+def _guidance_text(descriptions: List[str]) -> str:
+    return "\n".join([f"- {d}" for d in descriptions]) if descriptions else (
+        "Detect all sensitive information including names, IDs, addresses, phone numbers, "
+        "financial amounts, dates, birth dates, signatures, student IDs, social security numbers."
+    )
+
+
+def _word_elements_json(state: Dict[str, Any]) -> str:
+    """Slim word payload as JSON, serialized once per OCR result and reused across feedback cycles."""
+    word_elements = state.get("word_level_pdf_elements") or []
+    cached = state.get("_word_elements_json")
+    if cached is None or state.get("_word_elements_json_len") != len(word_elements):
+        cached = json.dumps(_llm_words_by_page(word_elements), ensure_ascii=False, separators=(",", ":"))
+        state["_word_elements_json"] = cached
+        state["_word_elements_json_len"] = len(word_elements)
+    return cached
+
+
+def _llm_words_by_page(word_elements: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    """Minimal {"id", "c"} word view per page for LLM payloads (no bboxes)."""
+    words_by_page: Dict[int, List[Dict[str, Any]]] = {}
+    for element in word_elements:
+        words_by_page.setdefault(element.get("page_number", 1), []).append(
+            {"id": element.get("element_id"), "c": element.get("content", "")}
+        )
+    return words_by_page
+
+
+def _locate_items(
+    llm_items: List[Any],
+    word_elements: List[Dict[str, Any]],
+    bbox_index: Optional[Dict[Tuple[int, Any], Dict[str, float]]] = None,
+) -> List[Dict[str, Any]]:
+    """Turn LLM items with element_ids into sensitive items with merged word bboxes."""
+    if bbox_index is None:
+        bbox_index = {(e.get("page_number", 1), e.get("element_id")): e.get("bbox", {}) for e in word_elements}
+    
+    final_items = []
+    for item in llm_items:
+        page_num = item.page_number
+        # Look up matching word boxes (unknown ids are ignored)
+        bboxes = [bbox_index[(page_num, eid)] for eid in item.element_ids or [] if (page_num, eid) in bbox_index]
+        if not bboxes:
+            continue
+        
+        final_items.append({
+            "page_number": page_num,
+            "content": item.content,
+            "reason": item.reason,
+            "bbox": _merge_bboxes(bboxes)
+        })
+    
+    return final_items
+
+
+def _map_exact_matches(
+    sensitive_content_items: List[Dict[str, Any]],
+    word_elements: List[Dict[str, Any]],
+    bbox_index: Dict[Tuple[int, Any], Dict[str, float]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Resolve items locally when their words can be pinned down on the item's page:
+    every whitespace token matches exactly one word and those words are adjacent
+    in reading order, or the whole value occurs exactly once as a run of
+    consecutive words.
+    
+    Returns (mapped items with bbox, items still needing the LLM).
+    """
+    if FORCE_LLM_MAPPING:
+        return [], list(sensitive_content_items)
+    
+    # page -> normalized word content -> element ids, page -> words in reading order,
+    # and (page, element id) -> position in that order
+    ids_by_word: Dict[int, Dict[str, List[Any]]] = {}
+    words_by_page: Dict[int, List[Dict[str, Any]]] = {}
+    position: Dict[Tuple[int, Any], int] = {}
+    for element in word_elements:
+        page_num = element.get("page_number", 1)
+        page_words = ids_by_word.setdefault(page_num, {})
+        page_words.setdefault(element.get("content", "").strip().lower(), []).append(element.get("element_id"))
+        page_list = words_by_page.setdefault(page_num, [])
+        position[(page_num, element.get("element_id"))] = len(page_list)
+        page_list.append(element)
+    
+    page_scans: Dict[int, _PageWordScan] = {}
+    resolved, residual = [], []
+    for item in sensitive_content_items:
+        page_num = item.get("page_num", 1)
+        page_words = ids_by_word.get(page_num, {})
+        tokens = item.get("sensitive_content", "").lower().split()
+        candidates = [page_words.get(token, []) for token in tokens]
+        
+        element_ids = []
+        if tokens and all(len(ids) == 1 for ids in candidates):
+            element_ids = [ids[0] for ids in candidates]
+            # Unique words scattered over the page (other lines, paragraphs) are not one value
+            order = [position[(page_num, eid)] for eid in element_ids]
+            if any(b != a + 1 for a, b in zip(order, order[1:])):
+                element_ids = []
+        if not element_ids:
+            if page_num not in page_scans:
+                page_scans[page_num] = _PageWordScan(words_by_page.get(page_num, []))
+            element_ids = page_scans[page_num].unique_run(tokens)
+        
+        if not element_ids:
+            residual.append(item)
+            continue
+        
+        resolved.append({
+            "page_number": page_num,
+            "content": item.get("sensitive_content", ""),
+            "reason": item.get("reason", ""),
+            "bbox": _merge_bboxes([bbox_index[(page_num, eid)] for eid in element_ids]),
+        })
+    
+    return resolved, residual
+
+
+class _PageWordScan:
+    """One page's words joined into a single lowercase string for word-aligned substring search."""
+    
+    def __init__(self, words: List[Dict[str, Any]]) -> None:
+        self.element_ids = [w.get("element_id") for w in words]
+        normalized = [" ".join(w.get("content", "").lower().split()) for w in words]
+        self.starts: List[int] = []
+        self.ends: Dict[int, int] = {}  # end offset -> word index
+        offset = 0
+        for index, word in enumerate(normalized):
+            self.starts.append(offset)
+            self.ends[offset + len(word)] = index
+            offset += len(word) + 1
+        self.text = " ".join(normalized)
+        self.start_index = {start: index for index, start in enumerate(self.starts)}
+    
+    def unique_run(self, tokens: List[str]) -> List[Any]:
+        """Element ids of the only word-aligned occurrence of tokens, or [] if absent or ambiguous."""
+        needle = " ".join(tokens)
+        if not needle:
+            return []
+        
+        match = None
+        pos = self.text.find(needle)
+        while pos != -1:
+            first = self.start_index.get(pos)
+            last = self.ends.get(pos + len(needle))
+            if first is not None and last is not None:
+                if match is not None:
+                    return []  # Appears more than once: let the LLM decide
+                match = (first, last)
+            pos = self.text.find(needle, pos + 1)
+        
+        if match is None:
+            return []
+        return self.element_ids[match[0]:match[1] + 1]
 
 
 # Helper functions
 
-def _init_di_client() -> DocumentIntelligenceClient:
-    """Initialize Azure Document Intelligence client."""
+@lru_cache(maxsize=1)
+def _get_di_client() -> DocumentIntelligenceClient:
+    """Shared Azure Document Intelligence client (its transport keeps connections alive)."""
     endpoint = os.getenv("AZURE_DI_ENDPOINT") or os.getenv("AZURE_ENDPOINT")
     key = os.getenv("AZURE_DI_KEY")
     if not endpoint or not key:
@@ -472,6 +849,133 @@ def _init_di_client() -> DocumentIntelligenceClient:
     return DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(key))
 
 
+def reset_clients() -> None:
+    """Drop the cached LLM and Document Intelligence clients (e.g. after changing credentials)."""
+    get_llm.cache_clear()
+    _get_di_client.cache_clear()
+
+
+def _ocr_cache_path(digest: str, model_id: str) -> str:
+    return os.path.join(OCR_CACHE_DIR, f"{digest}_{model_id}.json")
+
+
+def _load_cached_ocr(digest: str, model_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Return cached OCR elements for this PDF content and model, or None on a miss."""
+    if not OCR_CACHE_DIR:
+        return None
+    return _read_json_cache(_ocr_cache_path(digest, model_id))
+
+
+def _store_cached_ocr(digest: str, model_id: str, elements: List[Dict[str, Any]]) -> None:
+    """Cache OCR elements on disk; failed (empty) runs are not cached."""
+    if elements and OCR_CACHE_DIR:
+        _write_json_cache(_ocr_cache_path(digest, model_id), elements)
+
+
+def _first_llm_cache_key(instruction: str, page_text: str) -> str:
+    """Key on everything that shapes the response: deployment, instruction (with guidance) and text."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (os.getenv("OPENAI_DEPLOYMENT", "gpt-4o"), instruction, page_text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _load_cached_first_llm(key: str) -> Optional[List[Dict[str, Any]]]:
+    """Return cached first-LLM items from memory, falling back to disk; None on a miss."""
+    with _first_llm_memo_lock:
+        if key in _first_llm_memo:
+            _first_llm_memo.move_to_end(key)
+            return [dict(item) for item in _first_llm_memo[key]]
+    
+    if not LLM_CACHE_DIR:
+        return None
+    items = _read_json_cache(os.path.join(LLM_CACHE_DIR, f"{key}_first.json"))
+    if items is not None:
+        _remember_first_llm(key, items)
+    return items
+
+
+def _store_cached_first_llm(key: str, items: List[Dict[str, Any]]) -> None:
+    """Cache first-LLM items; empty results (including errors) are not cached."""
+    if not items:
+        return
+    _remember_first_llm(key, items)
+    if LLM_CACHE_DIR:
+        _write_json_cache(os.path.join(LLM_CACHE_DIR, f"{key}_first.json"), items)
+
+
+def _remember_first_llm(key: str, items: List[Dict[str, Any]]) -> None:
+    with _first_llm_memo_lock:
+        _first_llm_memo[key] = [dict(item) for item in items]
+        _first_llm_memo.move_to_end(key)
+        while len(_first_llm_memo) > FIRST_LLM_MEMORY_ENTRIES:
+            _first_llm_memo.popitem(last=False)
+
+
+def _cache_expired(path: str, now: float) -> bool:
+    return now - os.path.getmtime(path) > CACHE_MAX_AGE
+
+
+def _read_json_cache(path: str) -> Optional[Any]:
+    """Load a cache file; missing, unreadable or expired (CACHE_MAX_AGE) files are misses."""
+    try:
+        if _cache_expired(path, time.time()):
+            os.remove(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_cache_dir(cache_dir: str) -> None:
+    """Delete expired cache files so entries that are never read again don't pile up."""
+    now = time.time()
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            if _cache_expired(path, now):
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _write_json_cache(path: str, data: Any) -> None:
+    """Write a cache file atomically (temp file + rename)."""
+    cache_dir = os.path.dirname(path)
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        _prune_cache_dir(cache_dir)
+    except OSError as e:
+        print(f"⚠️ Could not write cache file {path}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _merge_bboxes(bboxes: List[Dict[str, float]]) -> Dict[str, float]:
+    """Union of one or more bboxes; a single box is returned unchanged."""
+    if len(bboxes) == 1:
+        return bboxes[0]
+    return {
+        "x0": min(b["x0"] for b in bboxes),
+        "y0": min(b["y0"] for b in bboxes),
+        "x1": max(b["x1"] for b in bboxes),
+        "y1": max(b["y1"] for b in bboxes)
+    }
+
+
 def _extract_paragraph_bbox(paragraph) -> Dict[str, float]:
     """Extract bounding box from paragraph."""
     if hasattr(paragraph, 'polygon') and paragraph.polygon:
@@ -495,25 +999,37 @@ def _polygon_to_bbox(polygon: List[float]) -> Dict[str, float]:
     }
 
 
-def _polygon_to_bbox_points(polygon: List[float], unit: str, di_w: float, di_h: float, pdf_pt_w: float, pdf_pt_h: float) -> Dict[str, float]:
-    """Convert Azure DI polygon coordinates to PyMuPDF points."""
-    # Compute axis-aligned bbox from polygon
-    xs = [polygon[i] for i in range(0, len(polygon), 2)] if polygon else [0.0]
-    ys = [polygon[i + 1] for i in range(0, len(polygon), 2)] if polygon else [0.0]
-    min_x, max_x = float(min(xs)), float(max(xs))
-    min_y, max_y = float(min(ys)), float(max(ys))
-
+def _unit_scale(unit: str, di_w: float, di_h: float, pdf_pt_w: float, pdf_pt_h: float) -> Tuple[float, float]:
+    """Return (sx, sy) mapping Azure DI page units to PyMuPDF points."""
     u = (unit or "").lower()
     if u == "inch":
         # Convert inches to points
-        return {"x0": min_x * 72.0, "y0": min_y * 72.0, "x1": max_x * 72.0, "y1": max_y * 72.0}
+        return 72.0, 72.0
     if u in ("pixel", "pixelperinch", "pixelperinch2", "pixel/unknown") or (di_w and di_h):
         # Scale pixels to PDF points using page sizes
         sx = (pdf_pt_w / di_w) if di_w else 1.0
         sy = (pdf_pt_h / di_h) if di_h else 1.0
-        return {"x0": min_x * sx, "y0": min_y * sy, "x1": max_x * sx, "y1": max_y * sy}
+        return sx, sy
     if u in ("cm", "centimeter"):
         k = 72.0 / 2.54
-        return {"x0": min_x * k, "y0": min_y * k, "x1": max_x * k, "y1": max_y * k}
+        return k, k
     # Fallback: assume already points
-    return {"x0": min_x, "y0": min_y, "x1": max_x, "y1": max_y}
+    return 1.0, 1.0
+
+
+def _polygons_to_bboxes(polygons: List[List[float]]) -> np.ndarray:
+    """Axis-aligned (N, 4) x0/y0/x1/y1 boxes for N flat [x, y, x, y, ...] polygons (unscaled)."""
+    n_points = {len(p) for p in polygons}
+    if len(n_points) == 1 and min(n_points) >= 2:
+        # Common case: every polygon has the same number of points (4 for DI words)
+        pts = np.asarray(polygons, dtype=float).reshape(len(polygons), -1, 2)
+        return np.concatenate([pts.min(axis=1), pts.max(axis=1)], axis=1)
+    
+    # Ragged or empty polygons: reduce each one separately (empty -> zero box)
+    out = np.zeros((len(polygons), 4))
+    for i, polygon in enumerate(polygons):
+        if len(polygon) >= 2:
+            pts = np.asarray(polygon, dtype=float)[: len(polygon) // 2 * 2].reshape(-1, 2)
+            out[i, :2] = pts.min(axis=0)
+            out[i, 2:] = pts.max(axis=0)
+    return out
@@ -1,8 +1,29 @@
 from __future__ import annotations
 
+import json
 from typing import Dict, Any, List
 
-from .model import AzureLLM
+from .model import get_llm
+from .state import get_page_text, pages_containing
+
+# Later cycles re-check only pages with hits, unless those cover more than this share of the document.
+# The first pass always reads the whole document, so this only applies when max_evaluator_cycles > 1.
+EVAL_FOCUS_MAX_FRACTION = 0.5
+
+_EVALUATOR_INSTRUCTION = (
+    "You are evaluating sensitive data detection quality. Your job is to find gaps and errors:\n\n"
+    "EVALUATION CRITERIA:\n"
+    "1. FALSE NEGATIVES: Find sensitive data in the PDF that matches the guidance but wasn't detected\n"
+    "2. FALSE POSITIVES: Find detected items that aren't actually sensitive per the guidance\n"
+    "3. QUALITY ASSESSMENT: Determine if the detection is acceptable or needs improvement\n\n"
+    "EVALUATION PROCESS:\n"
+    "- Read the detection guidance carefully\n"
+    "- Scan the PDF content for sensitive information matching the guidance\n"
+    "- Compare with what was actually detected\n"
+    "- Identify missing items (false negatives) and incorrect items (false positives)\n\n"
+    "Be CAREFUL and THOROUGH. The goal is to decrease both false negatives and false positives.\n"
+    "If significant issues are found, provide specific feedback to improve detection."
+)
 
 
 def run_evaluator(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -21,7 +42,7 @@ def run_evaluator(state: Dict[str, Any]) -> Dict[str, Any]:
 
     # Prevent infinite loops: limit evaluator feedback cycles  
     evaluator_cycles = state.get("evaluator_cycles", 0)
-    max_cycles = state.get("max_evaluator_cycles", 1)  # Default 3 cycles as specified
+    max_cycles = state.get("max_evaluator_cycles", 1)  # Default: a single evaluation pass
     
     # Initialize cycle counter if not present
     if "evaluator_cycles" not in state:
@@ -58,20 +79,16 @@ def run_evaluator(state: Dict[str, Any]) -> Dict[str, Any]:
         incorrect_detections: List[str]    # Items that were flagged but shouldn't be
         feedback_message: str              # Specific feedback for detector improvement
 
-    # Prepare PDF content for evaluation
-    pdf_content_by_page = {}
-    for element in page_level_pdf_elements:
-        page_num = element.get("page_number", 1)
-        content = element.get("content", "")
-        if page_num not in pdf_content_by_page:
-            pdf_content_by_page[page_num] = []
-        pdf_content_by_page[page_num].append(content)
-
-    # Build readable PDF content
-    pdf_text = ""
-    for page_num in sorted(pdf_content_by_page.keys()):
-        page_content = "\n".join(pdf_content_by_page[page_num])
-        pdf_text += f"\n\n--- Page {page_num} ---\n\n{page_content}"
+    # Readable PDF content, shared with the detector and built once per document
+    pdf_text = get_page_text(state)
+    
+    # After the first cycle, focus on pages with detections or previously reported misses
+    # (unreachable with the default max_evaluator_cycles=1, where only the full pass runs)
+    focus_pages = set(state.get("_pages_with_hits") or []) | {item["page_number"] for item in sensitive_data if item.get("page_number") is not None}
+    total_pages = len(state.get("_page_content_by_page") or {})
+    if evaluator_cycles > 0 and focus_pages and len(focus_pages) <= total_pages * EVAL_FOCUS_MAX_FRACTION:
+        pdf_text = get_page_text(state, pages=focus_pages)
+        print(f"📄 Evaluator: Checking {len(focus_pages)} of {total_pages} pages")
 
     # Prepare detection guidance
     guidance_text = "\n".join([f"- {desc}" for desc in sensitive_data_description])
@@ -81,21 +98,6 @@ def run_evaluator(state: Dict[str, Any]) -> Dict[str, Any]:
     for item in sensitive_data:
         detected_items.append(f"Page {item.get('page_number')}: '{item.get('content')}' (Reason: {item.get('reason')})")
 
-    instruction = (
-        "You are evaluating sensitive data detection quality. Your job is to find gaps and errors:\n\n"
-        "EVALUATION CRITERIA:\n"
-        "1. FALSE NEGATIVES: Find sensitive data in the PDF that matches the guidance but wasn't detected\n"
-        "2. FALSE POSITIVES: Find detected items that aren't actually sensitive per the guidance\n"
-        "3. QUALITY ASSESSMENT: Determine if the detection is acceptable or needs improvement\n\n"
-        "EVALUATION PROCESS:\n"
-        "- Read the detection guidance carefully\n"
-        "- Scan the PDF content for sensitive information matching the guidance\n"
-        "- Compare with what was actually detected\n"
-        "- Identify missing items (false negatives) and incorrect items (false positives)\n\n"
-        "Be CAREFUL and THOROUGH. The goal is to decrease both false negatives and false positives.\n"
-        "If significant issues are found, provide specific feedback to improve detection."
-    )
-    
     evaluation_data = {
         "detection_guidance": guidance_text,
         "pdf_content": pdf_text,
@@ -103,8 +105,9 @@ def run_evaluator(state: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     try:
-        llm = AzureLLM()
-        res: EvaluationResult = llm.create_structured_response(EvaluationResult, instruction, str(evaluation_data))
+        llm = get_llm()
+        res: EvaluationResult = llm.create_structured_response(EvaluationResult, _EVALUATOR_INSTRUCTION, json.dumps(evaluation_data, ensure_ascii=False))
+        state["_pages_with_hits"] = sorted(focus_pages | set(pages_containing(state, res.missing_sensitive_data or [])))
         
         if res.issues_found and res.feedback_message:
             # Append feedback to sensitive_data_description for detector improvement
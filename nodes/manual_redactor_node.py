@@ -3,11 +3,17 @@ Manual Redactor Node
 Handles manual redactions independently from the AI workflow using PyMuPDF
 """
 
-import fitz  # PyMuPDF
-import tempfile
+import logging
 import os
+from collections import defaultdict
 from typing import List, Dict, Any
 
+from .state import FITZ_LOCK, coerce_items
+from .redactor_node import _apply_all_redactions, _ensure_redacted_dir, bbox_coords, coalesce_rects, save_redacted_pdf
+
+# Per-rectangle tracing logs at DEBUG (REDACTFLOW_DEBUG=1 in the app)
+logger = logging.getLogger("redactflow.manual_redactor")
+
 
 def apply_manual_redactions(pdf_path: str, manual_rectangles: List[Dict[str, Any]]) -> str:
     """
@@ -19,82 +25,80 @@ def apply_manual_redactions(pdf_path: str, manual_rectangles: List[Dict[str, Any
         
     Returns:
         Path to the manually redacted PDF
+        
+    Raises:
+        ValueError: If a rectangle is malformed (see ``coerce_items``)
     """
+    import fitz  # PyMuPDF
+
+    manual_rectangles = coerce_items(manual_rectangles)
     if not manual_rectangles:
-        print("🔧 MANUAL REDACTOR: No manual rectangles to redact")
+        logger.info("🔧 MANUAL REDACTOR: No manual rectangles to redact")
         return pdf_path
     
-    print(f"🔧 MANUAL REDACTOR DEBUG:")
-    print(f"   📄 Source PDF: {pdf_path}")
-    print(f"   📋 Manual rectangles to redact: {len(manual_rectangles)}")
+    logger.debug("🔧 MANUAL REDACTOR DEBUG:")
+    logger.debug("   📄 Source PDF: %s", pdf_path)
+    logger.debug("   📋 Manual rectangles to redact: %s", len(manual_rectangles))
     
-    # Open the PDF
-    doc = fitz.open(pdf_path)
+    with FITZ_LOCK:
+        # Open the PDF
+        doc = fitz.open(pdf_path)
     
-    # Apply manual redactions
-    redacted_count = 0
-    for i, rect_item in enumerate(manual_rectangles):
-        page_number = rect_item.get("page_number", 1)
-        bbox = rect_item.get("bbox", {})
+        # Validate pages and group rectangles by page in one pass
+        trace = logger.isEnabledFor(logging.DEBUG)
+        rects_by_page = defaultdict(list)
+        for i, rect_item in enumerate(manual_rectangles):
+            page_number = rect_item.get("page_number", 1)
+            coords = bbox_coords(rect_item.get("bbox"))
         
-        print(f"   [{i+1}] Manual redaction: Page {page_number}, BBox: ({bbox.get('x0', 0):.1f}, {bbox.get('y0', 0):.1f}, {bbox.get('x1', 0):.1f}, {bbox.get('y1', 0):.1f})")
+            if trace:
+                logger.debug("   [%s] Manual redaction: Page %s, BBox: %s", i+1, page_number, coords)
         
-        # Convert to 0-based page index
-        page_idx = page_number - 1
+            # Convert to 0-based page index
+            page_idx = page_number - 1
         
-        if 0 <= page_idx < len(doc):
-            page = doc[page_idx]
-            
-            # Create rectangle for redaction
-            rect = fitz.Rect(
-                bbox.get("x0", 0),
-                bbox.get("y0", 0), 
-                bbox.get("x1", 0),
-                bbox.get("y1", 0)
-            )
-            
-            # Add black redaction annotation
-            redact_annot = page.add_redact_annot(rect)
-            redact_annot.set_colors(fill=[0, 0, 0])  # Black fill
-            redact_annot.update()
-            
-            redacted_count += 1
-            print(f"   ✅ Applied redaction {i+1} on page {page_number}")
-        else:
-            print(f"   ❌ Invalid page number: {page_number}")
+            if coords is None:
+                logger.warning("   ❌ Skipping empty or invalid bbox on page %s: %s", page_number, rect_item.get("bbox"))
+            elif 0 <= page_idx < len(doc):
+                rects_by_page[page_idx].append(fitz.Rect(coords))
+            else:
+                logger.warning("   ❌ Invalid page number: %s", page_number)
     
-    # Apply all redactions per page (correct PyMuPDF API)
-    try:
-        # Apply redactions on each page that has them
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+        redacted_count = sum(len(rects) for rects in rects_by_page.values())
+    
+        try:
+            # Add black redaction annotations and apply them, touching only pages that have any
+            for page_idx, rects in rects_by_page.items():
+                page = doc[page_idx]
+                for rect in coalesce_rects(rects):
+                    redact_annot = page.add_redact_annot(rect)
+                    redact_annot.set_colors(fill=[0, 0, 0])  # Black fill
+                    redact_annot.update()
+                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
         
-        print(f"   🎯 Applied {redacted_count} manual redactions")
+            logger.info("   🎯 Applied %s manual redactions", redacted_count)
         
-        # Save manual redacted files in output/redacted/ directory
-        base_name = os.path.basename(pdf_path).replace('.pdf', '')
-        redacted_dir = os.path.join(os.getcwd(), "output", "redacted")
-        os.makedirs(redacted_dir, exist_ok=True)
-        manual_redacted_path = os.path.join(redacted_dir, f"{base_name}_MANUAL_REDACTED.pdf")
+            # Save manual redacted files in output/redacted/ directory
+            base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+            manual_redacted_path = os.path.join(_ensure_redacted_dir(), f"{base_name}_MANUAL_REDACTED.pdf")
         
-        print(f"   💾 Saving manual redacted file to: {manual_redacted_path}")
-        doc.save(manual_redacted_path)
-        doc.close()
+            logger.debug("   💾 Saving manual redacted file to: %s", manual_redacted_path)
+            save_redacted_pdf(doc, manual_redacted_path)
+            doc.close()
         
-        # Verify file was created
-        if os.path.exists(manual_redacted_path):
-            file_size = os.path.getsize(manual_redacted_path)
-            print(f"   ✅ Manual redaction complete: {manual_redacted_path} ({file_size} bytes)")
-        else:
-            print(f"   ❌ ERROR: Manual redacted file was not created!")
+            # Verify file was created
+            if os.path.exists(manual_redacted_path):
+                file_size = os.path.getsize(manual_redacted_path)
+                logger.info("   ✅ Manual redaction complete: %s (%s bytes)", manual_redacted_path, file_size)
+            else:
+                logger.error("   ❌ ERROR: Manual redacted file was not created!")
         
-        return manual_redacted_path
+            return manual_redacted_path
         
-    except Exception as e:
-        print(f"   ❌ ERROR in manual redaction: {str(e)}")
-        doc.close()
-        return pdf_path
+        except Exception as e:
+            logger.error("   ❌ ERROR in manual redaction: %s", str(e))
+            doc.close()
+            return pdf_path
 
 
 def combine_ai_and_manual_redactions(ai_redacted_path: str, manual_rectangles: List[Dict[str, Any]]) -> str:
@@ -110,40 +114,32 @@ def combine_ai_and_manual_redactions(ai_redacted_path: str, manual_rectangles: L
         Path to the final combined redacted PDF
     """
     if not manual_rectangles:
-        print("🔧 COMBINING REDACTIONS: No manual rectangles, returning AI-redacted PDF as-is")
+        logger.info("🔧 COMBINING REDACTIONS: No manual rectangles, returning AI-redacted PDF as-is")
         return ai_redacted_path
     
     if not os.path.exists(ai_redacted_path):
-        print(f"❌ ERROR: AI-redacted PDF not found: {ai_redacted_path}")
+        logger.error("❌ ERROR: AI-redacted PDF not found: %s", ai_redacted_path)
         return ai_redacted_path
     
-    print(f"🔧 COMBINING REDACTIONS:")
-    print(f"   📄 Input: AI-redacted PDF → {ai_redacted_path}")
-    print(f"   📋 Applying {len(manual_rectangles)} additional manual redactions")
-    print(f"   📍 Manual rectangles received:")
-    for i, rect in enumerate(manual_rectangles):
-        print(f"      [{i+1}] Page: {rect.get('page_number')}, Content: {rect.get('content')}, BBox: {rect.get('bbox')}")
-    
-    # Apply manual redactions on top of the already AI-redacted PDF
-    temp_path = apply_manual_redactions(ai_redacted_path, manual_rectangles)
+    logger.debug("🔧 COMBINING REDACTIONS:")
+    logger.debug("   📄 Input: AI-redacted PDF → %s", ai_redacted_path)
+    logger.debug("   📋 Applying %s additional manual redactions", len(manual_rectangles))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("   📍 Manual rectangles received:")
+        for i, rect in enumerate(manual_rectangles):
+            logger.debug("      [%s] Page: %s, Content: %s, BBox: %s", i+1, rect.get('page_number'), rect.get('content'), rect.get('bbox'))
     
     # Create final filename in output directory indicating combined redactions
-    ai_base_name = os.path.basename(ai_redacted_path).replace('.pdf', '')
+    ai_base_name = os.path.splitext(os.path.basename(ai_redacted_path))[0]
     # Remove AI_REDACTED suffix if present
     if "_AI_REDACTED" in ai_base_name:
         clean_base = ai_base_name.replace("_AI_REDACTED", "")
     else:
         clean_base = ai_base_name.replace("_REDACTED", "").replace("_MANUAL_REDACTED", "")
     
-    redacted_dir = os.path.join(os.getcwd(), "output", "redacted")
-    os.makedirs(redacted_dir, exist_ok=True)
-    combined_path = os.path.join(redacted_dir, f"{clean_base}_COMBINED_REDACTED.pdf")
-    
-    # Rename the temporary file to final name
-    if os.path.exists(temp_path) and temp_path != combined_path:
-        os.rename(temp_path, combined_path)
-        print(f"   ✅ Output: Combined redacted PDF → {combined_path}")
-        return combined_path
+    combined_path = os.path.join(_ensure_redacted_dir(), f"{clean_base}_COMBINED_REDACTED.pdf")
     
-    print(f"   ✅ Output: Combined redacted PDF → {temp_path}")
-    return temp_path
+    # Apply manual redactions on top of the AI-redacted PDF, saving straight to the final name
+    _apply_all_redactions(ai_redacted_path, [], manual_rectangles, combined_path)
+    logger.info("   ✅ Output: Combined redacted PDF → %s", combined_path)
+    return combined_path
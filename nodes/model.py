@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import logging
 import os
-from typing import Any, Type
+from functools import lru_cache
+from typing import Any, Dict, Tuple, Type
 
 # Load environment variables from .env if present
 try:
@@ -10,6 +12,12 @@ try:
 except ImportError:
     pass
 
+logger = logging.getLogger("redactflow.model")
+
+# (endpoint, api_version, deployment) where native structured outputs were rejected;
+# those go straight to LangChain instead of paying for a failing request every call
+_NATIVE_PARSE_UNSUPPORTED: set = set()
+
 
 class AzureLLM:
     """Azure OpenAI client for chat and structured outputs.
@@ -40,6 +48,9 @@ class AzureLLM:
             azure_endpoint=self.azure_endpoint,
             api_key=self.openai_api_key,
         )
+        self._structured_chat = None
+        # Structured-output runnables per schema (module, qualname); nodes define schemas per call
+        self._structured_runnables: Dict[Tuple[str, str], Any] = {}
 
     def create_instructed_response(self, instruction: str, text: str) -> str:
         response = self.client.chat.completions.create(
@@ -52,20 +63,84 @@ class AzureLLM:
         )
         return response.choices[0].message.content or ""
 
+    def _chat_model(self) -> Any:
+        """LangChain chat model, created once per client so its HTTP pool is reused."""
+        if self._structured_chat is None:
+            try:
+                from langchain_openai import AzureChatOpenAI  # type: ignore
+            except Exception as exc:
+                raise ImportError("langchain-openai is required for structured output") from exc
+
+            self._structured_chat = AzureChatOpenAI(
+                azure_endpoint=self.azure_endpoint,
+                api_key=self.openai_api_key,
+                api_version=self.azure_api_version,
+                azure_deployment=self.model,
+                temperature=0,
+            )
+        return self._structured_chat
+
     def create_structured_response(self, schema_cls: Type[Any], instruction: str, text: str) -> Any:
-        """Return a Pydantic model instance using LangChain structured output (Azure)."""
-        try:
-            from langchain_openai import AzureChatOpenAI  # type: ignore
-        except Exception as exc:
-            raise ImportError("langchain-openai is required for structured output") from exc
+        """Return a Pydantic model instance via the SDK's native structured outputs.
 
-        llm = AzureChatOpenAI(
-            azure_endpoint=self.azure_endpoint,
-            api_key=self.openai_api_key,
-            api_version=self.azure_api_version,
-            azure_deployment=self.model,
-            temperature=0,
-        )
-        structured_llm = llm.with_structured_output(schema_cls)  # type: ignore[attr-defined]
+        Falls back to LangChain structured output when native parsing is unavailable or fails.
+        """
+        completions = getattr(getattr(self.client, "beta", None), "chat", None)
+        parse = getattr(getattr(completions, "completions", None), "parse", None)
+        if parse is not None and self._native_key() not in _NATIVE_PARSE_UNSUPPORTED:
+            try:
+                response = parse(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": instruction},
+                        {"role": "user", "content": text},
+                    ],
+                    response_format=schema_cls,
+                    temperature=0,
+                )
+                parsed = response.choices[0].message.parsed
+                if parsed is not None:
+                    return parsed
+            except Exception as exc:
+                if _is_unsupported_error(exc):
+                    _NATIVE_PARSE_UNSUPPORTED.add(self._native_key())
+                    logger.warning(
+                        "⚠️ Native structured output unsupported for %s (API %s); using LangChain from now on",
+                        self.model, self.azure_api_version, exc_info=True,
+                    )
+                else:
+                    logger.warning("⚠️ Native structured output failed (%s), falling back to LangChain", type(exc).__name__)
+        return self._create_structured_response_langchain(schema_cls, instruction, text)
+
+    def _native_key(self) -> Tuple[str, str, str]:
+        return (self.azure_endpoint or "", self.azure_api_version, self.model)
+
+    def _create_structured_response_langchain(self, schema_cls: Type[Any], instruction: str, text: str) -> Any:
+        """Return a Pydantic model instance using LangChain structured output (Azure)."""
+        key = (schema_cls.__module__, schema_cls.__qualname__)
+        structured_llm = self._structured_runnables.get(key)
+        if structured_llm is None:
+            structured_llm = self._chat_model().with_structured_output(schema_cls)  # type: ignore[attr-defined]
+            self._structured_runnables[key] = structured_llm
         prompt = f"{instruction}\n\n{text}"
         return structured_llm.invoke(prompt)
+
+
+def _is_unsupported_error(exc: Exception) -> bool:
+    """True for errors meaning the deployment/API version cannot do native parsing.
+
+    Transient failures (timeouts, rate limits, 5xx) and per-response issues
+    (length or content-filter stops) return False, so native is retried next call.
+    """
+    import openai
+
+    if isinstance(exc, (openai.BadRequestError, openai.NotFoundError, openai.UnprocessableEntityError)):
+        return True
+    # Raised client-side when the installed SDK cannot build the request
+    return isinstance(exc, (TypeError, AttributeError, NotImplementedError))
+
+
+@lru_cache(maxsize=8)
+def get_llm(model: str | None = None) -> AzureLLM:
+    """Shared AzureLLM per deployment so connection pools and TLS sessions survive across node calls."""
+    return AzureLLM(model)
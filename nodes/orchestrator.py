@@ -1,15 +1,76 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+import re
+from typing import Dict, Any, List, Optional, Tuple
 from langgraph.graph import StateGraph, END
 
-from .model import AzureLLM
+from .model import get_llm
+from .state import merge_descriptions
 from .searcher_node import run_searcher
 from .detector_node import run_detector
 from .evaluator_node import run_evaluator
 from .hitl_node import run_hitl
 from .redactor_node import run_redactor
 
+# Cheap routing for obvious prompts, before paying for an LLM call. A prompt takes the
+# keyword route only if every word in it is one of the terms or filler words below; any
+# other word (a qualifier like "IP" or "company", an extra data type, a negation) means
+# the prompt carries meaning the keywords would drop, so it goes to the LLM.
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['’-][a-z0-9]+)*")
+_REGULATION_TERMS = frozenset({"hipaa", "gdpr", "ccpa", "pipl", "pci", "pci-dss", "dss", "sox", "ferpa"})
+_DETECT_TERMS = {  # phrase -> description for the detector (plurals listed explicitly)
+    tuple(phrase.split()): desc
+    for phrases, desc in (
+        (("ssn", "ssns", "social security number", "social security numbers"), "Social security numbers"),
+        (("email", "emails", "e-mail", "e-mails", "email address", "email addresses"), "Email addresses"),
+        (("phone", "phones", "phone number", "phone numbers"), "Phone numbers"),
+        (("name", "names"), "Personal names"),
+        (("address", "addresses"), "Postal addresses"),
+        (("credit card", "credit cards", "credit card number", "credit card numbers"), "Credit card numbers"),
+    )
+    for phrase in phrases
+}
+_DETECT_TERM_MAX_WORDS = max(len(phrase) for phrase in _DETECT_TERMS)
+_FILLER_WORDS = frozenset({
+    "redact", "detect", "remove", "mask", "hide", "black", "out", "find",
+    "all", "any", "every", "the", "and", "or", "also", "in", "from", "this", "pdf", "document", "file", "please",
+    # Regulation phrasing ("redact per HIPAA", "GDPR compliance")
+    "per", "under", "for", "with", "according", "to", "compliance", "compliant", "rules", "requirements",
+})
+# Longer prompts usually carry nuance (exceptions, scope) the keyword route would drop
+PREFILTER_MAX_WORDS = 12
+
+
+def _prefilter_route(prompt: str) -> Optional[Tuple[str, List[str]]]:
+    """Return (next_node, descriptions) when keywords make the route obvious, else None."""
+    words = _WORD_RE.findall(prompt.lower())
+    if not words or len(words) > PREFILTER_MAX_WORDS:
+        return None
+
+    descriptions: List[str] = []
+    regulation = False
+    i = 0
+    while i < len(words):
+        # Longest detect phrase starting here, so "email address" never reads as "address"
+        for size in range(min(_DETECT_TERM_MAX_WORDS, len(words) - i), 0, -1):
+            desc = _DETECT_TERMS.get(tuple(words[i:i + size]))
+            if desc is not None:
+                descriptions.append(desc)
+                i += size
+                break
+        else:
+            if words[i] in _REGULATION_TERMS:
+                regulation = True
+            elif words[i] not in _FILLER_WORDS:
+                return None  # Word outside the vocabulary: let the LLM read the prompt
+            i += 1
+
+    if regulation and not descriptions:
+        return "Searcher", []
+    if descriptions and not regulation:
+        return "Detector", list(dict.fromkeys(descriptions))
+    return None
+
 
 def orchestrator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"🔧 ORCHESTRATOR NODE:")
@@ -28,6 +89,16 @@ def orchestrator_node(state: Dict[str, Any]) -> Dict[str, Any]:
         state["next_node"] = "Detector"
         return state
 
+    routed = _prefilter_route(prompt)
+    if routed is not None:
+        next_node, desc = routed
+        merge_descriptions(state, desc)
+        if next_node == "Searcher":
+            state["search_query"] = prompt
+        print(f"   ⚡ Keyword route to {next_node} (no LLM call)")
+        state["next_node"] = next_node
+        return state
+
     # Use LLM to summarize and route
     from pydantic import BaseModel
 
@@ -45,13 +116,12 @@ def orchestrator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     text = f"User prompt:\n{prompt}"
 
     try:
-        llm = AzureLLM()
+        llm = get_llm()
         res: OrchestratorDecision = llm.create_structured_response(OrchestratorDecision, instruction, text)
         desc = [d.strip() for d in (res.sensitive_descriptions or []) if d and d.strip()]
         if desc:
             # Functionality 1 & 2: Always append new descriptions to existing list
-            existing_descriptions = state.get("sensitive_data_description") or []
-            state["sensitive_data_description"] = existing_descriptions + desc
+            merge_descriptions(state, desc)
         if (res.search_query or "").strip() and res.next_node == "Searcher":
             print(f"   ➡️ Routing to Searcher with query: {res.search_query}")
             state["search_query"] = res.search_query.strip()  # type: ignore[union-attr]
@@ -95,8 +165,9 @@ def build_sanitizer_graph() -> StateGraph:
         "Detector": "Detector",  # Feedback loop to detector
         "HumanInLoop": "HumanInLoop"
     })
-    graph.add_edge("HumanInLoop", "HumanInLoop")
 
+    # HumanInLoop -> HumanInLoop is covered by route_from_hitl; an unconditional
+    # self-edge would also schedule HumanInLoop alongside Redactor on resume.
     def route_from_hitl(state: Dict[str, Any]) -> str:
         nxt = str(state.get("next_node") or "").strip()
         print(f"🔧 HITL ROUTING: next_node='{nxt}', user_approval='{state.get('user_approval')}'")
@@ -1,8 +1,59 @@
 from __future__ import annotations
 
-from typing import Dict, Any, Optional
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+import logging
+import math
 import os
-import fitz  # PyMuPDF
+import tempfile
+
+from .state import FITZ_LOCK, coerce_items
+
+# PyMuPDF is imported where it is used; this import only serves the annotations
+if TYPE_CHECKING:
+    import fitz  # PyMuPDF
+
+logger = logging.getLogger("redactflow.redactor")
+
+# Rectangles overlapping more than this (intersection over union) become one redaction
+COALESCE_IOU = 0.5
+
+# AI redactions are plain filled boxes unless REDACTFLOW_REDACTION_LABEL=1 asks for a
+# "[REDACTED]" label; the label costs MuPDF a font load and text layout per box
+AI_REDACTION_LABEL: Optional[str] = (
+    "[REDACTED]" if os.getenv("REDACTFLOW_REDACTION_LABEL", "").strip().lower() in ("1", "true", "yes") else None
+)
+
+
+def _ensure_redacted_dir() -> str:
+    """Return output/redacted/ under the working directory, creating it if missing.
+
+    Checked on every call (a cheap stat) so a directory removed while the app runs
+    is recreated, and a changed working directory is honored.
+    """
+    redacted_dir = os.path.join(os.getcwd(), "output", "redacted")
+    os.makedirs(redacted_dir, exist_ok=True)
+    return redacted_dir
+
+
+def bbox_coords(bbox: Any) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Normalized (x0, y0, x1, y1) of a BBox dict (inverted corners are swapped, like
+    fitz.Rect.normalize), or None when keys are missing, a value is NaN/infinite or
+    the box is empty.
+    """
+    try:
+        x0, y0, x1, y1 = (float(bbox[k]) for k in ("x0", "y0", "x1", "y1"))
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not all(math.isfinite(v) for v in (x0, y0, x1, y1)):
+        return None
+    x0, x1 = min(x0, x1), max(x0, x1)
+    y0, y1 = min(y0, y1), max(y0, y1)
+    if x0 == x1 or y0 == y1:
+        return None  # Zero area: nothing to redact
+    return x0, y0, x1, y1
 
 
 def _apply_redactions_to_pdf(
@@ -10,52 +61,199 @@ def _apply_redactions_to_pdf(
     sensitive_items: list[dict[str, Any]],
     output_path: Optional[str] = None,
     redaction_color: tuple = (0, 0, 0),
+    mark_only: Optional[bool] = None,
 ) -> str:
+    return _apply_all_redactions(pdf_path, sensitive_items, [], output_path, redaction_color, mark_only)
+
+
+def _apply_all_redactions(
+    pdf_path: str,
+    ai_items: list[dict[str, Any]],
+    manual_items: list[dict[str, Any]],
+    output_path: Optional[str] = None,
+    redaction_color: tuple = (0, 0, 0),
+    mark_only: Optional[bool] = None,
+) -> str:
+    """
+    Redact AI items and manual boxes (always plain) in one open/apply/save pass over the PDF.
+
+    AI boxes carry a "[REDACTED]" label only when mark_only is False (None follows
+    AI_REDACTION_LABEL). Plain boxes lay out no replacement text at all.
+    """
+    import fitz  # PyMuPDF
+
     if not output_path:
-        # Save AI redacted files in output/redacted/ directory
-        base_name = os.path.basename(pdf_path).replace('.pdf', '')
-        redacted_dir = os.path.join(os.getcwd(), "output", "redacted")
-        os.makedirs(redacted_dir, exist_ok=True)
-        output_path = os.path.join(redacted_dir, f"{base_name}_AI_REDACTED.pdf")
+        # Save redacted files in output/redacted/ directory
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        suffix = "COMBINED_REDACTED" if manual_items else "AI_REDACTED"
+        output_path = os.path.join(_ensure_redacted_dir(), f"{base_name}_{suffix}.pdf")
 
-    doc = fitz.open(pdf_path)
-    try:
-        for item in sensitive_items:
-            page_num = int(item.get("page_number", 1)) - 1
-            bbox = item.get("bbox", {"x0": 0, "y0": 0, "x1": 0, "y1": 0})
-            rect = fitz.Rect(bbox["x0"], bbox["y0"], bbox["x1"], bbox["y1"])
-            page = doc[page_num]
-            page.add_redact_annot(rect, text="[REDACTED]", fill=redaction_color)
-        for i in range(len(doc)):
-            doc[i].apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
-        doc.save(output_path)
-    finally:
-        doc.close()
+    # Group annotations by page so only pages with redactions are touched
+    ai_label = AI_REDACTION_LABEL if mark_only is None else (None if mark_only else "[REDACTED]")
+    annots_by_page = defaultdict(list)
+    for items, text in ((ai_items, ai_label), (manual_items, None)):
+        for item in items:
+            coords = bbox_coords(item.get("bbox"))
+            if coords is None:
+                logger.warning("   ❌ Skipping empty or invalid bbox on page %s: %s", item.get("page_number"), item.get("bbox"))
+                continue
+            annots_by_page[int(item.get("page_number", 1)) - 1].append((fitz.Rect(coords), text))
+
+    with FITZ_LOCK:
+        doc = fitz.open(pdf_path)
+        try:
+            for page_num, annots in annots_by_page.items():
+                if not 0 <= page_num < len(doc):
+                    logger.warning("   ❌ Invalid page number: %s", page_num + 1)
+                    continue
+                page = doc[page_num]
+                # Duplicate / heavily overlapping boxes become one annotation (per label)
+                for text in {t for _, t in annots}:
+                    for rect in coalesce_rects([r for r, t in annots if t == text]):
+                        if text is None:
+                            page.add_redact_annot(rect, fill=redaction_color)
+                        else:
+                            page.add_redact_annot(rect, text=text, fill=redaction_color)
+                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+            save_redacted_pdf(doc, output_path)
+        finally:
+            doc.close()
     return output_path
 
 
+def coalesce_rects(rects: List["fitz.Rect"], min_iou: float = COALESCE_IOU) -> List["fitz.Rect"]:
+    """Merge rectangles whose IoU exceeds min_iou into their bounding box (x-sorted sweep)."""
+    import fitz  # PyMuPDF
+
+    merged: List["fitz.Rect"] = []
+    for rect in sorted(rects, key=lambda r: r.x0):
+        rect = fitz.Rect(rect)
+        for i, other in enumerate(merged):
+            if other.x1 < rect.x0:
+                continue  # Entirely to the left: cannot overlap
+            inter = fitz.Rect(other) & rect
+            if inter.is_empty:
+                continue
+            inter_area = inter.width * inter.height
+            union_area = other.width * other.height + rect.width * rect.height - inter_area
+            if union_area > 0 and inter_area / union_area > min_iou:
+                merged[i] = other | rect
+                break
+        else:
+            merged.append(rect)
+    return merged
+
+
+def save_redacted_pdf(doc: "fitz.Document", output_path: str) -> None:
+    """
+    Save a full, compacted rewrite atomically (temp file + rename), so readers
+    never see a partial PDF.
+
+    Never saved incrementally: an incremental update appends to the original
+    bytes, which would keep the redacted content recoverable in the file.
+    """
+    out_dir = os.path.dirname(output_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".pdf.tmp")
+    os.close(fd)
+    try:
+        # garbage=3 drops unreferenced objects (e.g. removed redacted content) and merges duplicates
+        doc.save(tmp_path, garbage=3, deflate=True)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _redact_batch_worker(pdf_item: Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]) -> str:
+    # Runs in a child process: the document is opened there, never pickled
+    pdf_path, ai_items, manual_items = pdf_item
+    return _apply_all_redactions(pdf_path, ai_items, manual_items)
+
+
+def redact_batch(
+    pdf_paths: List[str],
+    items_per_pdf: List[List[Dict[str, Any]]],
+    manual_per_pdf: Optional[List[List[Dict[str, Any]]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Redact several PDFs in parallel processes (standalone API, not a graph node).
+
+    items_per_pdf / manual_per_pdf hold one list per path, in the same order.
+    Returns one result per path, in input order, shaped like run_detector_batch:
+    {"pdf_path", "status": "ok" | "skipped" | "error", "final_pdf_path", "error"}.
+    "skipped" (nothing to redact) keeps the original path as final_pdf_path.
+    A failing document does not abort the batch.
+    """
+    manual_per_pdf = manual_per_pdf or [[] for _ in pdf_paths]
+    if not len(pdf_paths) == len(items_per_pdf) == len(manual_per_pdf):
+        raise ValueError("redact_batch needs one item list (and manual list) per PDF path")
+
+    def result(i: int, status: str, final_pdf_path: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+        return {"pdf_path": pdf_paths[i], "status": status, "final_pdf_path": final_pdf_path, "error": error}
+
+    results: List[Dict[str, Any]] = [{} for _ in pdf_paths]
+    jobs: Dict[int, Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+    for i, (path, items, manual) in enumerate(zip(pdf_paths, items_per_pdf, manual_per_pdf)):
+        path = str(path or "").strip()
+        try:
+            if not path:
+                raise ValueError("empty PDF path")
+            manual = coerce_items(manual)
+        except ValueError as e:
+            logger.error("   ❌ Batch redaction skipped %r: %s", pdf_paths[i], e)
+            results[i] = result(i, "error", error=str(e))
+            continue
+        if items or manual:
+            jobs[i] = (path, list(items or []), manual)
+        else:
+            results[i] = result(i, "skipped", final_pdf_path=path)
+
+    logger.info("   ▶️ Batch redaction of %s of %s PDFs...", len(jobs), len(pdf_paths))
+
+    def collect(i: int, run) -> None:
+        try:
+            results[i] = result(i, "ok", final_pdf_path=run())
+        except Exception as e:
+            logger.error("   ❌ Batch redaction failed for %s: %s", pdf_paths[i], e)
+            results[i] = result(i, "error", error=str(e))
+
+    if len(jobs) <= 1:
+        for i, job in jobs.items():
+            collect(i, lambda job=job: _redact_batch_worker(job))
+    else:
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4, len(jobs))) as ex:
+            futures = {ex.submit(_redact_batch_worker, job): i for i, job in jobs.items()}
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+    return results
+
+
 def run_redactor(state: Dict[str, Any]) -> Dict[str, Any]:
-    print(f"🔧 REDACTOR NODE:")
-    print(f"   📊 Entering with state keys: {list(state.keys())}")
-    print(f"   📄 PDF path: {state.get('pdf_path', 'None')}")
-    print(f"   🤖 AI items to redact: {len(state.get('sensitive_data', []))}")
-    print(f"   ✅ User approval status: {state.get('user_approval', 'None')}")
+    logger.info("🔧 REDACTOR NODE:")
+    logger.debug("   📊 Entering with state keys: %s", list(state.keys()))
+    logger.debug("   📄 PDF path: %s", state.get('pdf_path', 'None'))
+    logger.debug("   🤖 AI items to redact: %s", len(state.get('sensitive_data', [])))
+    logger.debug("   ✅ User approval status: %s", state.get('user_approval', 'None'))
     
     pdf_path = str(state.get("pdf_path") or "").strip()
     items = state.get("sensitive_data") or []
+    manual = coerce_items(state.get("manual_rectangles"))
     
     # Log each item that will be redacted
-    for i, item in enumerate(items):
-        print(f"   [{i+1}] Page {item.get('page_number')}: {item.get('content', '')[:50]}...")
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, item in enumerate(items):
+            logger.debug("   [%s] Page %s: %s...", i+1, item.get('page_number'), item.get('content', '')[:50])
+    logger.debug("   ✍️ Manual boxes to redact: %s", len(manual))
     
-    if not pdf_path or not items:
-        print(f"   ❌ Skipping AI redaction: pdf_path={bool(pdf_path)}, items={len(items)}")
+    if not pdf_path or not (items or manual):
+        logger.warning("   ❌ Skipping redaction: pdf_path=%s, items=%s, manual=%s", bool(pdf_path), len(items), len(manual))
         return state
     
-    print(f"   ▶️ Proceeding with AI redaction...")
-    final_path = _apply_redactions_to_pdf(pdf_path, items)
+    logger.debug("   ▶️ Proceeding with redaction...")
+    final_path = _apply_all_redactions(pdf_path, items, manual)
     state["final_pdf_path"] = final_path
-    print(f"   ✅ AI redaction complete: {final_path}")
+    logger.info("   ✅ Redaction complete: %s", final_path)
     
     return state
 
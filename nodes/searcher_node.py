@@ -1,9 +1,86 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Hashable, List, Mapping, Optional, Tuple
 import os
+import re
+import threading
+import time
+
+from .model import get_llm
+from .state import merge_descriptions
+
+# Fallback sources per jurisdiction (already unique)
+_AUTHORITIES: Mapping[str, Tuple[Tuple[str, str], ...]] = MappingProxyType({
+    "US": (
+        ("NIST (PII Guidance)", "https://www.nist.gov/"),
+        ("FTC", "https://www.ftc.gov/"),
+        ("HHS (HIPAA)", "https://www.hhs.gov/hipaa/index.html"),
+    ),
+    "EU": (
+        ("EU GDPR", "https://gdpr.eu/"),
+        ("EDPB", "https://edpb.europa.eu/"),
+    ),
+    "CA": (
+        ("Office of the Privacy Commissioner of Canada", "https://www.priv.gc.ca/"),
+    ),
+    "CN": (
+        ("National People's Congress", "https://www.npc.gov.cn/"),
+        ("Cyberspace Administration of China", "https://www.cac.gov.cn/"),
+        ("People's Bank of China", "https://www.pbc.gov.cn/"),
+        ("CBIRC", "https://www.cbirc.gov.cn/"),
+        ("CSRC", "https://www.csrc.gov.cn/"),
+    ),
+})
+
+# Tavily domain allow-list per jurisdiction
+_ALLOW_DOMAINS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "US": ("hhs.gov", "ftc.gov", "nist.gov"),
+    "EU": ("gdpr.eu", "edpb.europa.eu", "europa.eu"),
+    "CA": ("priv.gc.ca",),
+    "CN": ("npc.gov.cn", "cac.gov.cn", "pbc.gov.cn", "cbirc.gov.cn", "csrc.gov.cn"),
+})
+
+
+
+class _TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# Repeat searches (same query/jurisdiction) within an hour reuse Tavily and summary results
+_SEARCH_CACHE = _TTLCache(maxsize=512, ttl=3600)
+_SUMMARY_CACHE = _TTLCache(maxsize=512, ttl=3600)
+
+
+def _normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower())
 
-from .model import AzureLLM
 
 class Searcher:
     """Regulation searcher that can leverage Tavily and LLM summarization."""
@@ -12,35 +89,6 @@ class Searcher:
         self.use_ai = use_ai
         self._tavily_key: Optional[str] = os.getenv("TAVILY_KEY")
 
-        self._authorities: Dict[str, List[Tuple[str, str]]] = {
-            "US": [
-                ("NIST (PII Guidance)", "https://www.nist.gov/"),
-                ("FTC", "https://www.ftc.gov/"),
-                ("HHS (HIPAA)", "https://www.hhs.gov/hipaa/index.html"),
-            ],
-            "EU": [
-                ("EU GDPR", "https://gdpr.eu/"),
-                ("EDPB", "https://edpb.europa.eu/"),
-            ],
-            "CA": [
-                ("Office of the Privacy Commissioner of Canada", "https://www.priv.gc.ca/"),
-            ],
-            "CN": [
-                ("National People's Congress", "https://www.npc.gov.cn/"),
-                ("Cyberspace Administration of China", "https://www.cac.gov.cn/"),
-                ("People's Bank of China", "https://www.pbc.gov.cn/"),
-                ("CBIRC", "https://www.cbirc.gov.cn/"),
-                ("CSRC", "https://www.csrc.gov.cn/"),
-            ],
-        }
-
-        self._allow_domains: Dict[str, List[str]] = {
-            "US": ["hhs.gov", "ftc.gov", "nist.gov"],
-            "EU": ["gdpr.eu", "edpb.europa.eu", "europa.eu"],
-            "CA": ["priv.gc.ca"],
-            "CN": ["npc.gov.cn", "cac.gov.cn", "pbc.gov.cn", "cbirc.gov.cn", "csrc.gov.cn"],
-        }
-
     def search(self, query: str, industry: Optional[str], jurisdiction: Optional[str]) -> Dict[str, Any]:
         sources = self._find_sources(query, industry, jurisdiction)
         additions = self._summarize_with_llm(query, industry, jurisdiction, sources) if self.use_ai else []
@@ -52,8 +100,13 @@ class Searcher:
             try:
                 from tavily import TavilyClient  # type: ignore
 
+                include_domains = list(_ALLOW_DOMAINS.get(juris, ()))
+                cache_key = (_normalize_query(query), juris, tuple(include_domains))
+                cached = _SEARCH_CACHE.get(cache_key)
+                if cached is not None:
+                    return list(cached)
+
                 client = TavilyClient(api_key=self._tavily_key)
-                include_domains = self._allow_domains.get(juris, [])
                 res = client.search(query, search_depth="advanced", include_domains=include_domains or None, max_results=5)
                 results = res.get("results", []) if isinstance(res, dict) else []
                 out: List[Tuple[str, str]] = []
@@ -66,31 +119,28 @@ class Searcher:
                     seen.add(url)
                     out.append((title, url))
                 if out:
+                    _SEARCH_CACHE.set(cache_key, tuple(out))
                     return out
             except Exception:
                 pass
         # fallback to authorities list
-        base = self._authorities.get(juris, [])
-        seen = set()
-        out: List[Tuple[str, str]] = []
-        for name, url in base:
-            if url not in seen:
-                seen.add(url)
-                out.append((name, url))
-        return out[:5]
+        return list(_AUTHORITIES.get(juris, ())[:5])
 
     def _summarize_with_llm(
         self, query: str, industry: Optional[str], jurisdiction: Optional[str], sources: List[Tuple[str, str]]
     ) -> List[str]:
-        try:
-            from pydantic import BaseModel
-        except Exception:
+        if not sources:
+            return []  # Nothing to summarize: skip the LLM round trip
+        schema = _summary_schema()
+        if schema is None:
             return []
 
-        citations_text = "\n".join([f"- {name}: {url}" for name, url in sources])
+        cache_key = (_normalize_query(query), industry or "", (jurisdiction or "").upper(), tuple(sources))
+        cached = _SUMMARY_CACHE.get(cache_key)
+        if cached is not None:
+            return list(cached)
 
-        class OutSchema(BaseModel):
-            sensitive_descriptions: List[str]
+        citations_text = "\n".join([f"- {name}: {url}" for name, url in sources])
 
         instruction = (
             "You are a compliance analyst. Given a search query, optional industry/jurisdiction, and sources,"
@@ -100,13 +150,30 @@ class Searcher:
             f"Query: {query}\nIndustry: {industry or ''}\nJurisdiction: {jurisdiction or ''}\nSources:\n{citations_text}"
         )
         try:
-            llm = AzureLLM()
-            res: OutSchema = llm.create_structured_response(OutSchema, instruction, user_prompt)
-            return [s.strip() for s in (res.sensitive_descriptions or []) if s and s.strip()]
+            llm = get_llm()
+            res = llm.create_structured_response(schema, instruction, user_prompt)
+            descriptions = [s.strip() for s in (res.sensitive_descriptions or []) if s and s.strip()]
+            if descriptions:
+                _SUMMARY_CACHE.set(cache_key, tuple(descriptions))
+            return descriptions
         except Exception:
             return []
 
 
+@lru_cache(maxsize=1)
+def _summary_schema() -> Optional[type]:
+    """Structured-output schema for the summary, built once (pydantic stays a lazy import)."""
+    try:
+        from pydantic import BaseModel
+    except Exception:
+        return None
+
+    class OutSchema(BaseModel):
+        sensitive_descriptions: List[str]
+
+    return OutSchema
+
+
 def run_searcher(state: Dict[str, Any]) -> Dict[str, Any]:
     query = str(state.get("search_query") or "").strip()
     if not query:
@@ -118,10 +185,7 @@ def run_searcher(state: Dict[str, Any]) -> Dict[str, Any]:
         result = searcher.search(query=query, industry=industry, jurisdiction=jurisdiction)
         desc = result.get("descriptions", [])
         if desc:
-            state.setdefault("sensitive_data_description", [])
-            state["sensitive_data_description"] = list(
-                dict.fromkeys((state.get("sensitive_data_description") or []) + desc)
-            )
+            merge_descriptions(state, desc)
     except Exception:
         pass
     # Clear the query after processing
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
-from typing import TypedDict, Literal, List, Dict, Optional
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Iterable, TypedDict, Literal, List, Dict, Optional, Tuple, Union
 from pydantic import Field
 
 
+# PyMuPDF's global context is not thread-safe, even with one Document per thread:
+# hold this around any fitz work (UI rendering, OCR page splitting, redaction)
+FITZ_LOCK = threading.RLock()
+
+
 # Coordinate system: PyMuPDF points (72 points = 1 inch)
 class BBox(TypedDict):
     x0: float
@@ -40,6 +48,14 @@ class SanitizerState(TypedDict, total=False):
     page_level_pdf_elements: List[PdfElement]  # Page-level content for LLM analysis
     word_level_pdf_elements: List[PdfElement]  # Word-level coordinates for mapping
 
+    # Page text derived once from page_level_pdf_elements (see get_page_text)
+    _page_content_by_page: Dict[int, List[str]]
+    _page_text_joined: str
+    _page_text_source_len: int
+    _word_elements_json: str  # Slim word payload for the LLM, serialized once
+    _word_elements_json_len: int
+    _pages_with_hits: List[int]  # Pages the evaluator saw detections or misses on
+
     # Final detection output (from detector node dual LLM)
     sensitive_data: List[SensitiveItem]
 
@@ -47,6 +63,9 @@ class SanitizerState(TypedDict, total=False):
     evaluator_cycles: int
     max_evaluator_cycles: int  # Default 3
 
+    # Boxes drawn by the user in the UI, redacted together with sensitive_data
+    manual_rectangles: List[SensitiveItem]
+
     # Artifacts
     preview_pdf_path: str
     final_pdf_path: str
@@ -59,3 +78,94 @@ class SanitizerState(TypedDict, total=False):
     industry: Optional[str]
     jurisdiction: Optional[str]
     regulations: List[str]
+
+
+_BBOX_KEYS = ("x0", "y0", "x1", "y1")
+
+
+def coerce_items(raw: Union[str, bytes, Iterable[Dict[str, Any]], None]) -> List[SensitiveItem]:
+    """
+    Validate sensitive items (e.g. manual_rectangles) once at the state boundary.
+
+    Accepts a JSON array or already-decoded dicts and returns items with an int
+    page_number and float bbox values. Malformed items raise ValueError instead of
+    silently falling back to zero coordinates.
+    """
+    if raw is None:
+        return []
+    if isinstance(raw, (str, bytes)):
+        raw = json.loads(raw)
+
+    items: List[SensitiveItem] = []
+    for i, item in enumerate(raw):
+        try:
+            bbox = item["bbox"]
+            items.append({
+                "page_number": int(item.get("page_number", 1)),
+                "content": str(item.get("content", "")),
+                "reason": str(item.get("reason", "")),
+                "bbox": {k: float(bbox[k]) for k in _BBOX_KEYS},
+            })
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Malformed item #{i + 1}: {item!r}") from e
+    return items
+
+
+def _build_page_text(elements: List[PdfElement]) -> Tuple[Dict[int, List[str]], str]:
+    """Group element contents by page and join them into the LLM-readable page text."""
+    content_by_page: Dict[int, List[str]] = defaultdict(list)
+    for element in elements:
+        content_by_page[element.get("page_number", 1)].append(element.get("content", ""))
+
+    return dict(content_by_page), _join_pages(content_by_page, content_by_page)
+
+
+def _join_pages(content_by_page: Dict[int, List[str]], pages: Iterable[int]) -> str:
+    return "".join(
+        f"\n\n--- Page {page_num} ---\n\n" + "\n".join(content_by_page[page_num])
+        for page_num in sorted(pages)
+        if page_num in content_by_page
+    )
+
+
+def get_page_text(state: Dict[str, Any], pages: Optional[Iterable[int]] = None) -> str:
+    """
+    Return the joined page text, rebuilding it only when the page elements change.
+
+    With ``pages``, only those pages are joined (same per-page format).
+    """
+    elements = state.get("page_level_pdf_elements") or []
+    cached = state.get("_page_text_joined")
+    if cached is None or state.get("_page_text_source_len") != len(elements):
+        content_by_page, cached = _build_page_text(elements)
+        state["_page_content_by_page"] = content_by_page
+        state["_page_text_joined"] = cached
+        state["_page_text_source_len"] = len(elements)
+
+    if pages is None:
+        return cached
+    return _join_pages(state["_page_content_by_page"], pages)
+
+
+def merge_descriptions(state: Dict[str, Any], new: Iterable[str]) -> List[str]:
+    """Append unseen descriptions to sensitive_data_description in place, keeping order."""
+    descriptions = state.get("sensitive_data_description")
+    if descriptions is None:
+        descriptions = state["sensitive_data_description"] = []
+    seen = set(descriptions)
+    for desc in new:
+        if desc not in seen:
+            descriptions.append(desc)
+            seen.add(desc)
+    return descriptions
+
+
+def pages_containing(state: Dict[str, Any], values: Iterable[str]) -> List[int]:
+    """Pages whose text contains any of the values (case-insensitive); call get_page_text first."""
+    needles = [v.lower() for v in values if v]
+    content_by_page = state.get("_page_content_by_page") or {}
+    return [
+        page_num
+        for page_num, lines in content_by_page.items()
+        if needles and any(n in "\n".join(lines).lower() for n in needles)
+    ]
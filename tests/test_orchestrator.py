@@ -0,0 +1,39 @@
+import pytest
+
+from nodes.orchestrator import _prefilter_route
+
+
+@pytest.mark.parametrize("prompt", [
+    # Qualified terms: the keyword alone would mislabel them
+    "Redact IP addresses",
+    "Redact company names",
+    # Extra data types the keywords don't cover would be dropped
+    "Redact names and dates of birth",
+    "Redact phone numbers and account numbers",
+    "Redact SSNs and medical record numbers",
+    "Redact patient names, DOB and MRN",
+    # Negations and exceptions
+    "don't redact names, only SSNs",
+    "Redact everything except addresses",
+    # Regulation plus explicit data types
+    "Redact names under HIPAA",
+    "",
+])
+def test_prompts_outside_the_vocabulary_go_to_the_llm(prompt):
+    assert _prefilter_route(prompt) is None
+
+
+@pytest.mark.parametrize("prompt, descriptions", [
+    ("Redact email addresses", ["Email addresses"]),
+    ("Redact emails, phone numbers and names", ["Email addresses", "Phone numbers", "Personal names"]),
+    ("Redact names and addresses", ["Personal names", "Postal addresses"]),
+    ("Detect all SSNs in this PDF", ["Social security numbers"]),
+    ("Redact credit card numbers", ["Credit card numbers"]),
+])
+def test_plain_keyword_prompts_route_to_detector(prompt, descriptions):
+    assert _prefilter_route(prompt) == ("Detector", descriptions)
+
+
+@pytest.mark.parametrize("prompt", ["HIPAA", "Redact per GDPR", "PCI DSS compliance"])
+def test_regulation_prompts_route_to_searcher(prompt):
+    assert _prefilter_route(prompt) == ("Searcher", [])
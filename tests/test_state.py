@@ -0,0 +1,48 @@
+from nodes.state import get_page_text, pages_containing
+
+
+def _page_elements():
+    # Pages out of order and interleaved, as OCR paragraphs can arrive
+    return [
+        {"element_id": 1, "page_number": 1, "content": "Patient: John Smith", "bbox": {}},
+        {"element_id": 2, "page_number": 2, "content": "Invoice total: $120", "bbox": {}},
+        {"element_id": 3, "page_number": 1, "content": "SSN 123-45-6789", "bbox": {}},
+        {"element_id": 4, "page_number": 4, "content": "Contact: jane@example.com", "bbox": {}},
+        {"element_id": 5, "page_number": 3, "content": "No sensitive data here", "bbox": {}},
+    ]
+
+
+def test_sliced_page_text_matches_full_text_for_those_pages():
+    state = {"page_level_pdf_elements": _page_elements()}
+    full = get_page_text(state)
+
+    # All pages: identical to the full context
+    assert get_page_text(state, pages=[4, 3, 2, 1]) == full
+
+    # Any slice is exactly the full text's sections for those pages, in page order
+    sections = {page: get_page_text(state, pages=[page]) for page in (1, 2, 3, 4)}
+    assert full == "".join(sections[page] for page in (1, 2, 3, 4))
+    assert get_page_text(state, pages={4, 1}) == sections[1] + sections[4]
+    assert sections[1] == "\n\n--- Page 1 ---\n\nPatient: John Smith\nSSN 123-45-6789"
+
+
+def test_unknown_pages_are_ignored_in_slices():
+    state = {"page_level_pdf_elements": _page_elements()}
+    get_page_text(state)
+    assert get_page_text(state, pages=[2, 99]) == get_page_text(state, pages=[2])
+    assert get_page_text(state, pages=[]) == ""
+
+
+def test_page_text_is_rebuilt_when_elements_change():
+    state = {"page_level_pdf_elements": _page_elements()[:2]}
+    get_page_text(state)
+    state["page_level_pdf_elements"] = _page_elements()
+    assert "jane@example.com" in get_page_text(state)
+    assert "jane@example.com" in get_page_text(state, pages=[4])
+
+
+def test_pages_containing_finds_the_pages_a_slice_needs():
+    state = {"page_level_pdf_elements": _page_elements()}
+    get_page_text(state)
+    assert sorted(pages_containing(state, ["john smith", "JANE@EXAMPLE.COM"])) == [1, 4]
+    assert pages_containing(state, [""]) == []